@@ -11,8 +11,17 @@ from collections import UserDict
 import os
 import re
 
+from birthdayindex import BirthdayIndex
+from changeevent import BookCleared, RecordAdded, RecordRemoved, \
+    RecordRenamed
 from name import Name
+from nametrie import NameTrie
+from phoneindex import PhoneIndex
 from record import Record
+from rwlock import NoLock
+from sortednames import SortedNames
+from textindex import TextIndex
+from transaction import Transaction
 
 
 class AddressBookException(Exception):
@@ -22,8 +31,17 @@ class AddressBookException(Exception):
 
 
 class AddressBook(UserDict):
+    # Indexes registered in each address book
+    default_indexes = {"text": TextIndex
+                      , "names": SortedNames
+                      , "birthdays": BirthdayIndex
+                      , "phones": PhoneIndex
+                      , "words": NameTrie
+                      }
+    # ThreadSafeAddressBook has RWLock
+    lock = NoLock()
 
-    def __init__(self, records=()):
+    def __init__(self, records=(), build_indexes=True):
         """ Instead tuple() in records can be used list[] or vice versa: 
         ab = AddressBook(
             ("Mykola", (("Phone", "111-22-33"), ("Phone", "111-44-55"), ...)))
@@ -32,9 +50,15 @@ class AddressBook(UserDict):
             ("Mykola": (("Phone", "111-22-33"), ("Phone", "111-44-55"), ...))),
             ("Oleksa": (("Phone", "333-22-33"), ("Phone", "333-44-55"), ...))),
         ))
+        If build_indexes is False, default indexes are not registered:
+        they can be registered later or restored from IndexCache.
         """
         super().__init__({})
+        self.indexes = {}
         self[None] = records # call __setitem__()
+        if build_indexes:
+            # Index is built faster at once than record by record
+            self.create_indexes()
         self.is_modified = False
 
     def __getitem__(self, key):
@@ -77,12 +101,16 @@ class AddressBook(UserDict):
         """
         if key is None:
             if len(value) == 0:
+                # Records which are still held by someone leave book too
+                for record in self.data.values():
+                    record.observers.remove(self._emit)
                 self.data.clear()
+                self._emit(BookCleared())
                 self.is_modified = True
                 return
             if isinstance(value, tuple) or isinstance(value, list):
                 if isinstance(value[0], str):
-                    self.data[Name(value[0])] = Record(value[1:])   # (1)
+                    self._attach(Name(value[0]), Record(value[1:])) # (1)
                     self.is_modified = True
                     return
                 for item in value:                                  # (2)
@@ -90,27 +118,31 @@ class AddressBook(UserDict):
                         raise AddressBookException(
                             f"absent required name as "
                             f"the first item in {item}")
-                    self.data[Name(item[0])] = Record(item[1:])
+                    self._attach(Name(item[0]), Record(item[1:]))
                     self.is_modified = True
                 return
             raise AddressBookException(f"not supported value {value}")
         elif isinstance(key, Name):
             if isinstance(value, tuple) or isinstance(value, list): # (3)  
-                self.data[key] = Record(value)
+                self._attach(key, Record(value))
             elif isinstance(value, Record):                         # (4)
-                self.data[key] = value
+                self._attach(key, value)
             elif isinstance(value, str):                            # (5)
-                record = self.data[key]
-                self.data.pop(key)
-                key.name = value
+                if key != value and Name(value) in self.data:
+                    raise AddressBookException(
+                        f"name '{value}' already exists")
+                record = self.data.pop(key)
+                old_name = str(key)
+                key.value = value
                 self.data[key] = record
+                self._emit(RecordRenamed(old_name, key, record))
             else:
                 raise AddressBookException(f"not supported value {value}")
         elif isinstance(key, str):
             if isinstance(value, tuple) or isinstance(value, list): # (6)
-                self.data[Name(key)] = Record(value)
+                self._attach(Name(key), Record(value))
             elif isinstance(value, Record):                         # (7)
-                self.data[Name(key)] = value
+                self._attach(Name(key), value)
             else:
                 raise AddressBookException(f"not supported value {value}")
         else:
@@ -119,12 +151,94 @@ class AddressBook(UserDict):
         self.is_modified = True
         return
 
+    def transaction(self):
+        """Context manager of all or nothing bulk change"""
+        return Transaction(self)
+
+    def create_indexes(self):
+        """Registers absent default indexes"""
+        for (name, index_class) in AddressBook.default_indexes.items():
+            if name not in self.indexes:
+                self.register_index(name, index_class())
+
+    @property
+    def text_index(self):
+        return self.indexes["text"]
+
+    @property
+    def sorted_names(self):
+        return self.indexes["names"]
+
+    def register_index(self, name: str, index, rebuild=True):
+        """Builds index and keeps it current on each change"""
+        if rebuild:
+            index.rebuild(self)
+        self.indexes[name] = index
+        return index
+
+    def unregister_index(self, name: str):
+        return self.indexes.pop(name)
+
+    def _emit(self, event):
+        for index in self.indexes.values():
+            index.notify(event)
+
+    def check_indexes(self) -> tuple:
+        """Rebuilds each index from scratch and compares it with
+        the registered one. Returns names of inconsistent indexes"""
+        inconsistent = ()
+        for (name, index) in self.indexes.items():
+            fresh = type(index)()
+            fresh.rebuild(self)
+            if fresh.state() != index.state():
+                inconsistent += (name,)
+        return inconsistent
+
+    def __delitem__(self, key):
+        """Each record leaves address book here"""
+        record = self.data[key]
+        record.observers.remove(self._emit)
+        del self.data[key]
+        self._emit(RecordRemoved(key, record))
+
+    def _attach(self, name, record):
+        """Each record gets into address book here"""
+        present = self.data.get(name)
+        if present is record:
+            return
+        if present is not None:
+            present.observers.remove(self._emit)
+            self._emit(RecordRemoved(name, present))
+        self.data[name] = record
+        record.observers.append(self._emit)
+        self._emit(RecordAdded(name, record))
+
     def __str__(self):
         return str(self[None])
 
     def keys(self):
         return tuple(super().keys())
 
+    def sorted_keys(self, first="", last="") -> tuple:
+        """Names in alphabet order from first up to names
+        starting with last inclusive"""
+        return self.sorted_names.range(first, last)
+
+    def prefix_keys(self, prefix: str) -> tuple:
+        """Names starting with prefix in alphabet order"""
+        return self.sorted_names.prefix(prefix)
+
+    def phone_keys(self, phone: str) -> tuple:
+        """Names with phone equal to phone or, when phone ends
+        with '*', starting with its digits"""
+        if phone.endswith('*'):
+            return self.indexes["phones"].prefix(phone)
+        return self.indexes["phones"].equal(phone)
+
+    def complete_word(self, prefix: str, limit=None) -> list:
+        """Words of names starting with prefix in alphabet order"""
+        return self.indexes["words"].complete(prefix, limit)
+
     def report(self, names = None, index=1):
         if names is None:
             names = list(self.data.keys())
@@ -175,9 +289,38 @@ class AddressBook(UserDict):
                     yield name
                 index += 1
 
-    def JSON_helper(self):
+    def find(self, query: str) -> tuple:
+        """Finds records by words in Address and Comment fields:
+            address:Остробрамська comment:алкаш героїв*
+        Word without field title is looked up in both fields,
+        '*' in the end of word matches any word suffix.
+        """
+        terms = ()
+        for term in query.split():
+            title = None
+            (prefix, colon, word) = term.partition(':')
+            if bool(colon):
+                title = prefix.capitalize()
+                if title not in TextIndex.titles:
+                    raise AddressBookException(
+                        f"field '{prefix}' is not indexed")
+            else:
+                word = term
+            tokens = TextIndex.tokenize(word)
+            # Only the last token of '*'-ended word is prefix
+            terms += tuple((token, title, False) for token in tokens[:-1])
+            terms += tuple((token, title, word.endswith('*'))
+                           for token in tokens[-1:])
+        if len(terms) == 0:
+            raise AddressBookException("word to find is required")
+        return self.text_index.find(terms)
+
+    def JSON_helper(self, names=None):
+        if names is None:
+            names = self.data.keys()
         ab = {}
-        for (name, record) in self.data.items():
+        for name in names:
+            record = self.data[name]
             rec_list = list(record.as_tuple_of_tuples())
             rec_list.sort(reverse=True, key=lambda it: it[0])
             ab[str(name)] = rec_list
@@ -0,0 +1,134 @@
+"""Class BirthdayIndex
+
+Author: Dmytro Tarasiuk
+URL: https://github.com/RoyBebru/addressbook
+Email: RoyBebru@gmail.com
+License: MIT
+"""
+
+
+from bisect import bisect_left, bisect_right, insort
+
+from index import Index
+
+
+class BirthdayIndex(Index):
+    """Birthdays as sorted 'YYYY.MM.DD' keys: date range costs
+    O(log N + k)"""
+
+    def __init__(self):
+        # Sorted (key, serial) pairs: serial keeps equal keys apart
+        self.items = []
+        # Serial -> record, record -> (key, serial), record -> Name
+        self.records = {}
+        self.record_items = {}
+        self.names = {}
+        self.serial = 0
+
+    @staticmethod
+    def key(birthday: str) -> str:
+        """'dd.mm.YYYY' -> 'YYYY.mm.dd'"""
+        return ".".join(reversed(birthday.split(".")))
+
+    def _birthday_key(self, record):
+        for field in record.fields:
+            if field.title == "Birthday" and bool(field.value):
+                return BirthdayIndex.key(field.value)
+        return None
+
+    def _link(self, record):
+        key = self._birthday_key(record)
+        if key is None:
+            return
+        self.serial += 1
+        item = (key, self.serial)
+        insort(self.items, item)
+        self.records[self.serial] = record
+        self.record_items[record] = item
+
+    def _unlink(self, record):
+        item = self.record_items.pop(record, None)
+        if item is None:
+            return
+        del self.items[bisect_left(self.items, item)]
+        del self.records[item[1]]
+
+    def rebuild(self, ab):
+        self.clear()
+        for (name, record) in ab.data.items():
+            self.names[record] = name
+            key = self._birthday_key(record)
+            if key is not None:
+                self.serial += 1
+                self.items.append((key, self.serial))
+                self.records[self.serial] = record
+                self.record_items[record] = (key, self.serial)
+        self.items.sort()
+
+    def on_record_added(self, name, record):
+        self.names[record] = name
+        self._link(record)
+
+    def on_record_removed(self, name, record):
+        self._unlink(record)
+        self.names.pop(record, None)
+
+    def on_record_renamed(self, old_name, name, record):
+        self.names[record] = name
+
+    def on_record_changed(self, record):
+        item = self.record_items.get(record)
+        if item is not None and item[0] == self._birthday_key(record):
+            return # birthday is not changed
+        self._unlink(record)
+        self._link(record)
+
+    def clear(self):
+        self.__init__()
+
+    def state(self):
+        return sorted((key, str(self.names[self.records[serial]]))
+                      for (key, serial) in self.items)
+
+    def _bounds(self, first, last, include_first, include_last) -> tuple:
+        if first is None:
+            start = 0
+        elif include_first:
+            start = bisect_left(self.items, (first,))
+        else:
+            start = bisect_right(self.items, (first, self.serial + 1))
+        if last is None:
+            stop = len(self.items)
+        elif include_last:
+            stop = bisect_right(self.items, (last, self.serial + 1))
+        else:
+            stop = bisect_left(self.items, (last,))
+        return (start, max(start, stop))
+
+    def count(self, first=None, last=None, include_first=True,
+              include_last=True) -> int:
+        (start, stop) = self._bounds(first, last, include_first, include_last)
+        return stop - start
+
+    def range(self, first=None, last=None, include_first=True,
+              include_last=True) -> tuple:
+        """Names with birthday between keys first and last"""
+        (start, stop) = self._bounds(first, last, include_first, include_last)
+        return tuple(self.names[self.records[serial]]
+                     for (__, serial) in self.items[start:stop])
+
+    def dump(self):
+        return {"items": self.items,
+                "names": {serial: str(self.names[record])
+                          for (serial, record) in self.records.items()}}
+
+    def load(self, state, lookup):
+        self.clear()
+        for (name, record) in lookup.values():
+            self.names[record] = name
+        self.items = state["items"]
+        for (key, serial) in self.items:
+            record = lookup[state["names"][serial]][1]
+            self.records[serial] = record
+            self.record_items[record] = (key, serial)
+        self.serial = max((serial for (__, serial) in self.items), default=0)
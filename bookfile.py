@@ -0,0 +1,253 @@
+"""Class BookFile
+
+Author: Dmytro Tarasiuk
+URL: https://github.com/RoyBebru/addressbook
+Email: RoyBebru@gmail.com
+License: MIT
+"""
+
+
+import gzip
+import hashlib
+import io
+import json
+import lzma
+import os
+from pathlib import Path
+import re
+
+try:
+    import zstandard
+except ModuleNotFoundError:
+    zstandard = None # .zst books are not supported
+
+
+class BookFileException(Exception):
+    def __init__(self, *args, **kwargs):
+        # Call parent constructor
+        super(Exception, self).__init__(*args, **kwargs)
+
+
+class _Digested(io.RawIOBase):
+    """Raw file which hashes bytes going through it"""
+
+    def __init__(self, fh):
+        self.fh = fh
+        self.sha1 = hashlib.sha1()
+
+    def readable(self):
+        return True
+
+    def writable(self):
+        return True
+
+    def readinto(self, buffer):
+        count = self.fh.readinto(buffer)
+        self.sha1.update(memoryview(buffer)[:count])
+        return count
+
+    def write(self, data):
+        self.sha1.update(data)
+        return self.fh.write(data)
+
+
+class _ChunkReader:
+    """Text stream read by chunks: consumed text is dropped"""
+    spaces = re.compile(r"\s*")
+
+    def __init__(self, text):
+        self.text = text
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.is_eof = False
+
+    def _more(self) -> bool:
+        if self.is_eof:
+            return False
+        chunk = self.text.read(BookFile.chunk_size)
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        self.is_eof = not bool(chunk)
+        return not self.is_eof
+
+    def peek(self) -> str:
+        """The next non space character or "" in the end"""
+        while True:
+            self.pos = _ChunkReader.spaces.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer) or not self._more():
+                return self.buffer[self.pos:self.pos + 1]
+
+    def expect(self, chars: str) -> str:
+        char = self.peek()
+        if char == "" or char not in chars:
+            raise BookFileException(
+                f"wrong book file: '{char}' instead of '{chars}'")
+        self.pos += 1
+        return char
+
+    def decode(self):
+        self.peek()
+        while True:
+            try:
+                (item, self.pos) = self.decoder.raw_decode(self.buffer,
+                                                           self.pos)
+                return item
+            except json.JSONDecodeError as e:
+                # Item could be not read whole yet
+                if not self._more():
+                    raise BookFileException(f"wrong book file: {e.msg}")
+
+
+class BookFile:
+    """Address book file in JSON: plain or compressed by codec of file
+    suffix (main.abo.gz, main.abo.xz, main.abo.zst). Book is written
+    record by record and read by chunks through the codec, so neither
+    JSON text nor compressed bytes are kept whole in memory. Digest is
+    sha1 of file bytes: it is got while the file is read or written.
+    """
+    # Suffix -> function(binary file, mode) of codec stream over file.
+    # The same content gives the same file: gzip header has no time
+    codecs = {".gz": lambda fh, mode: gzip.GzipFile(fileobj=fh, mode=mode,
+                                                    compresslevel=6, mtime=0),
+              ".xz": lambda fh, mode: lzma.LZMAFile(fh, mode),
+              ".zst": lambda fh, mode: (
+                  zstandard.ZstdCompressor().stream_writer(fh, closefd=False)
+                  if mode == "wb" else
+                  zstandard.ZstdDecompressor().stream_reader(fh,
+                                                             closefd=False)),
+              }
+    chunk_size = 64 * 1024
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.codec = self.path.suffix.lower()
+        if self.codec not in BookFile.codecs:
+            self.codec = None
+        elif self.codec == ".zst" and zstandard is None:
+            raise BookFileException(
+                "zstd compressed book requires 'zstandard' package")
+        # sha1 of file bytes after the last read or write
+        self.digest = None
+
+    @staticmethod
+    def is_supported(suffix: str) -> bool:
+        """Codec of suffix can be used: its package is installed"""
+        return suffix != ".zst" or zstandard is not None
+
+    def _stream(self, fh, mode):
+        if self.codec is None:
+            return fh
+        return BookFile.codecs[self.codec](fh, mode)
+
+    def write(self, content: dict, path=None):
+        """Writes content: name -> [[title, value], ...]. Plain book is
+        indented to be read by man. path is used to write temporary
+        file instead of book"""
+        indent = 2 if self.codec is None else None
+        encoder = json.JSONEncoder(indent=indent, ensure_ascii=False)
+        with open(path or self.path, "wb") as fh:
+            raw = _Digested(fh)
+            buffered = io.BufferedWriter(raw, BookFile.chunk_size)
+            stream = self._stream(buffered, "wb")
+            text = io.TextIOWrapper(stream, encoding="utf-8")
+            for chunk in encoder.iterencode(content):
+                text.write(chunk)
+            text.flush()
+            if stream is not buffered:
+                stream.close() # codec writes its trailer
+            buffered.flush()
+        self.digest = raw.sha1.hexdigest()
+
+    def __iter__(self):
+        """Yields (name, [[title, value], ...]) while file is read"""
+        with open(self.path, "rb") as fh:
+            raw = _Digested(fh)
+            buffered = io.BufferedReader(raw, BookFile.chunk_size)
+            if os.fstat(fh.fileno()).st_size == 0:
+                self.digest = raw.sha1.hexdigest()
+                return # empty book
+            text = io.TextIOWrapper(self._stream(buffered, "rb"),
+                                    encoding="utf-8")
+            try:
+                yield from BookFile._records(text)
+            except (EOFError, gzip.BadGzipFile, lzma.LZMAError,
+                    UnicodeDecodeError) as e:
+                raise BookFileException(f"damaged book file: {e}")
+            # The rest of file is hashed too
+            while bool(buffered.read(BookFile.chunk_size)):
+                pass
+        self.digest = raw.sha1.hexdigest()
+
+    @staticmethod
+    def _records(text):
+        """Parses JSON object by chunks: each key and value is decoded
+        by raw_decode() as soon as it is read whole"""
+        reader = _ChunkReader(text)
+        if reader.peek() == "":
+            return # empty file
+        reader.expect("{")
+        if reader.peek() == "}":
+            return
+        while True:
+            name = reader.decode()
+            reader.expect(":")
+            yield (name, reader.decode())
+            if reader.expect(",}") == "}":
+                return
+
+    def read(self) -> dict:
+        return dict(iter(self))
+
+
+if __name__ == "__main__":
+    # Converts book into other format by suffixes:
+    # $ python3 bookfile.py main.abo main.abo.xz
+    # Without arguments: load and save time against file size by codec
+    import sys
+    import tempfile
+    import time
+
+    if len(sys.argv) == 3:
+        book = BookFile(sys.argv[2])
+        book.write(BookFile(sys.argv[1]).read())
+        print(f"'{sys.argv[2]}': {os.stat(sys.argv[2]).st_size} bytes")
+        sys.exit(0)
+
+    def letters(number: int) -> str:
+        word = ""
+        for __ in range(4):
+            (number, ix) = divmod(number, 32)
+            word += chr(ord("а") + ix)
+        return word.capitalize()
+
+    suffixes = [""] + [suffix for suffix in BookFile.codecs.keys()
+                       if BookFile.is_supported(suffix)]
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in (1000, 10000, 100000):
+            content = {f"Абонент {letters(ix)}": [
+                ["Phone", f"+38 (067) {ix // 100:03d}-{ix % 100:02d}-11"],
+                ["Phone", f"044 {ix % 1000:03d}-{ix // 1000:02d}-22"],
+                ["Address", f"вул. Остробрамська {ix % 200}, кв. {ix}"]]
+                for ix in range(count)}
+            print(f"{count} records:")
+            for suffix in suffixes:
+                book = BookFile(Path(tmp) / ("main.abo" + suffix))
+                start = time.perf_counter()
+                book.write(content)
+                save_seconds = time.perf_counter() - start
+                start = time.perf_counter()
+                assert book.read() == content
+                load_seconds = time.perf_counter() - start
+                print(f"  {book.path.name:13s} "
+                      f"{os.stat(book.path).st_size:9d} bytes, "
+                      f"save {save_seconds:.3f} s, load {load_seconds:.3f} s")
+                if suffix == "":
+                    # Whole file in memory as it was read before
+                    start = time.perf_counter()
+                    with open(book.path, "rb") as fh:
+                        json.loads(fh.read().decode("utf-8"))
+                    print(f"  {'':13s} whole file json.loads(): "
+                          f"{time.perf_counter() - start:.3f} s")
+    if zstandard is None:
+        print("zstd is skipped: 'zstandard' package is not installed")
@@ -0,0 +1,378 @@
+"""Class BookHistory
+
+Author: Dmytro Tarasiuk
+URL: https://github.com/RoyBebru/addressbook
+Email: RoyBebru@gmail.com
+License: MIT
+"""
+
+
+from datetime import datetime
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from name import Name
+
+
+class HistoryException(Exception):
+    def __init__(self, *args, **kwargs):
+        # Call parent constructor
+        super(Exception, self).__init__(*args, **kwargs)
+
+
+class _Tree:
+    """Hash tree of records: leaf is dict name -> record hash and node
+    is list of fanout child hashes. Tree is updated in place: only
+    leaves of changed records and their ancestors are hashed again"""
+
+    def __init__(self, depth: int):
+        self.depth = depth
+        # Name -> JSON text of record: changed records are found by it
+        self.texts = {}
+        self.leaves = [{} for __ in range(BookHistory.fanout ** depth)]
+        # Hashes by level: levels[0] is [root], levels[depth] are leaves
+        self.levels = None
+
+    @property
+    def root(self) -> str:
+        return self.levels[0][0]
+
+    def update(self, texts: dict, put):
+        """texts: name -> JSON text of record. put(hash, raw) stores
+        objects which are new for the tree"""
+        dirty = set()
+        for name in self.texts.keys() - texts.keys():
+            leaf = BookHistory.leaf_of(name, self.depth)
+            del self.texts[name]
+            del self.leaves[leaf][name]
+            dirty.add(leaf)
+        for (name, text) in texts.items():
+            if self.texts.get(name) == text:
+                continue
+            raw = text.encode("utf-8")
+            digest = BookHistory._hash(raw)
+            put(digest, raw)
+            leaf = BookHistory.leaf_of(name, self.depth)
+            self.texts[name] = text
+            self.leaves[leaf][name] = digest
+            dirty.add(leaf)
+        if self.levels is None:
+            self.levels = [[None] * BookHistory.fanout ** level
+                           for level in range(self.depth + 1)]
+            dirty = set(range(len(self.leaves)))
+        for leaf in dirty:
+            raw = BookHistory._raw(dict(sorted(self.leaves[leaf].items())))
+            self.levels[self.depth][leaf] = BookHistory._hash(raw)
+            put(self.levels[self.depth][leaf], raw)
+        for level in range(self.depth - 1, -1, -1):
+            dirty = set(ix // BookHistory.fanout for ix in dirty)
+            children = self.levels[level + 1]
+            for ix in dirty:
+                raw = BookHistory._raw(children[ix * BookHistory.fanout:
+                                                (ix + 1) * BookHistory.fanout])
+                self.levels[level][ix] = BookHistory._hash(raw)
+                put(self.levels[level][ix], raw)
+
+
+class BookHistory:
+    """Versions of address book kept in directory:
+        objects/ab/cdef...  content addressed record, leaf or node
+        versions/000001     manifest: time, count, depth, root hash
+    Records are distributed into leaves of hash tree by name hash.
+    Leaf maps name to record hash, node lists hashes of its children.
+    Depth of tree grows with the book, so leaf keeps about leaf_size
+    records. Unchanged records, leaves and nodes are shared between
+    versions: a changed record costs its leaf and depth nodes only.
+    Versions of the first format list 256 leaves of depth 2 instead
+    of root: they are read as such tree.
+    """
+    fanout = 16
+    max_depth = 5
+    # Desired records in leaf
+    leaf_size = 16
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.objects = self.path / "objects"
+        self.versions = self.path / "versions"
+        # Tree of the last commit: the next commit updates it
+        self.tree = None
+
+    @staticmethod
+    def _hash(content: bytes) -> str:
+        return hashlib.sha1(content).hexdigest()
+
+    @staticmethod
+    def leaf_of(name: str, depth: int) -> int:
+        return int(hashlib.sha1(name.encode("utf-8")).hexdigest()[:depth], 16)
+
+    @staticmethod
+    def depth_for(count: int, depth=None) -> int:
+        """Depth of tree for count records. Present depth is kept while
+        leaves are up to 4 times fuller or emptier than leaf_size, so
+        the tree is not rebuilt when the book size goes to and fro"""
+        def fits(depth, factor):
+            return count <= (BookHistory.fanout ** depth
+                             * BookHistory.leaf_size * factor)
+        if depth is not None and (depth == 1 or not fits(depth - 1, 1 / 4)) \
+                and (depth == BookHistory.max_depth or fits(depth, 4)):
+            return depth
+        depth = 1
+        while depth < BookHistory.max_depth and not fits(depth, 1):
+            depth += 1
+        return depth
+
+    def _object_path(self, digest: str) -> Path:
+        return self.objects / digest[:2] / digest[2:]
+
+    @staticmethod
+    def _raw(content) -> bytes:
+        return json.dumps(content, ensure_ascii=False).encode("utf-8")
+
+    @staticmethod
+    def texts_of(ab) -> dict:
+        """Name -> JSON text of record as SharedBook keeps it"""
+        return {name: json.dumps(rec_list, ensure_ascii=False)
+                for (name, rec_list) in ab.JSON_helper().items()}
+
+    def _put(self, digest: str, raw: bytes):
+        path = self._object_path(digest)
+        if path.exists():
+            return # object is shared with other version
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as fh:
+            fh.write(raw)
+        os.replace(tmp_path, path)
+
+    def _get(self, digest: str):
+        try:
+            with open(self._object_path(digest), "rb") as fh:
+                return json.loads(fh.read().decode("utf-8"))
+        except FileNotFoundError:
+            raise HistoryException(f"object {digest} is lost")
+
+    def version_numbers(self) -> tuple:
+        try:
+            return tuple(sorted(int(path.name)
+                                for path in self.versions.iterdir()
+                                if path.name.isdigit()))
+        except FileNotFoundError:
+            return ()
+
+    def manifest(self, number: int) -> dict:
+        try:
+            with open(self.versions / f"{number:06d}", "r") as fh:
+                return json.loads(fh.read())
+        except FileNotFoundError:
+            raise HistoryException(f"version {number} is not found")
+
+    def _create(self, number: int, text: str) -> bool:
+        """Creates manifest of version if number is free. Other process
+        sharing the book can take the same number at the same time"""
+        path = self.versions / f"{number:06d}"
+        tmp_path = self.versions / f"{os.getpid()}.tmp"
+        with open(tmp_path, "w") as fh:
+            fh.write(text)
+        try:
+            # Whole manifest appears at once: link fails on existing file
+            os.link(tmp_path, path)
+            return True
+        except FileExistsError:
+            return False
+        except OSError:
+            pass # file system without hard links
+        finally:
+            os.unlink(tmp_path)
+        try:
+            with open(path, "x") as fh:
+                fh.write(text)
+            return True
+        except FileExistsError:
+            return False
+
+    def commit(self, ab, book_digest=None, texts=None):
+        """Stores ab as new version if it differs from the last one.
+        Returns number of version or None. Same book_digest as in the
+        last version means the same content: records are not hashed.
+        texts: name -> JSON text of record if it is known (SharedBook):
+        only records which differ from the last commit are hashed"""
+        numbers = self.version_numbers()
+        last = self.manifest(numbers[-1]) if bool(numbers) else None
+        if book_digest is not None and last is not None \
+                and last.get("book") == book_digest:
+            return None
+        if texts is None:
+            texts = BookHistory.texts_of(ab)
+        depth = BookHistory.depth_for(
+            len(texts), None if self.tree is None else self.tree.depth)
+        if self.tree is None or self.tree.depth != depth:
+            self.tree = _Tree(depth)
+        self.tree.update(texts, self._put)
+        if last is not None and last.get("root") == self.tree.root:
+            return None
+        self.versions.mkdir(parents=True, exist_ok=True)
+        text = json.dumps({"time": datetime.now().isoformat(
+                               timespec="seconds"),
+                           "count": len(texts),
+                           "book": book_digest,
+                           "depth": depth,
+                           "root": self.tree.root})
+        number = numbers[-1] + 1 if bool(numbers) else 1
+        while not self._create(number, text):
+            number += 1
+        return number
+
+    def report(self) -> str:
+        return os.linesep.join(
+            f"#{number} {manifest['time'].replace('T', ' ')} "
+            f"{manifest['count']} record(s)"
+            for (number, manifest) in ((number, self.manifest(number))
+                                       for number in self.version_numbers()))
+
+    def _leaves(self, tree: dict, get) -> list:
+        """Hashes of all leaves of tree: {"depth", "root"} or
+        {"depth", "leaves"}"""
+        if tree.get("leaves") is not None:
+            return tree["leaves"]
+        hashes = [tree["root"]]
+        for __ in range(tree["depth"]):
+            hashes = [child for digest in hashes for child in get(digest)]
+        return hashes
+
+    def _differing_leaves(self, old: dict, new: dict, get) -> tuple:
+        """Returns (old leaf hashes, new leaf hashes) of leaves which
+        differ. Trees of the same depth are compared from the root:
+        only differing nodes are read"""
+        if old["depth"] != new["depth"]:
+            return (self._leaves(old, get), self._leaves(new, get))
+        if old.get("root") is None or new.get("root") is None:
+            pairs = [pair for pair in zip(self._leaves(old, get),
+                                          self._leaves(new, get))
+                     if pair[0] != pair[1]]
+        else:
+            pairs = [(old["root"], new["root"])]
+            for __ in range(old["depth"]):
+                pairs = [pair for (old_node, new_node) in pairs
+                         if old_node != new_node
+                         for pair in zip(get(old_node), get(new_node))]
+            pairs = [pair for pair in pairs if pair[0] != pair[1]]
+        return (tuple(old_leaf for (old_leaf, __) in pairs),
+                tuple(new_leaf for (__, new_leaf) in pairs))
+
+    def _tree_of(self, number: int) -> dict:
+        manifest = self.manifest(number)
+        if "buckets" in manifest:
+            # The first format: 256 leaves of name hash first 2 hex digits
+            return {"depth": 2, "leaves": manifest["buckets"]}
+        return {"depth": manifest["depth"], "root": manifest["root"]}
+
+    def _records(self, leaves, get) -> dict:
+        """Name -> record hash in leaves"""
+        records = {}
+        for digest in leaves:
+            records.update(get(digest))
+        return records
+
+    def records(self, number: int) -> dict:
+        """Name -> [[title, value], ...] of version"""
+        tree = self._tree_of(number)
+        return {name: self._get(digest) for (name, digest)
+                in self._records(self._leaves(tree, self._get),
+                                 self._get).items()}
+
+    def diff(self, number: int, other=None) -> dict:
+        """Compares version with other version (the last one if None)
+        or with address book. Only differing leaves are read.
+        Returns name -> (old record list, new record list) of differing
+        records, absent record is None"""
+        old_tree = self._tree_of(number)
+        # Objects of address book tree are not stored: hash -> raw
+        objects = {}
+
+        def get(digest):
+            if digest in objects:
+                return json.loads(objects[digest].decode("utf-8"))
+            return self._get(digest)
+
+        if other is None or isinstance(other, int):
+            if other is None:
+                other = self.version_numbers()[-1]
+            new_tree = self._tree_of(other)
+        else:
+            tree = _Tree(BookHistory.depth_for(len(other)))
+            tree.update(BookHistory.texts_of(other), objects.__setitem__)
+            new_tree = {"depth": tree.depth, "root": tree.root}
+        (old_leaves, new_leaves) = self._differing_leaves(old_tree, new_tree,
+                                                          get)
+        old = self._records(old_leaves, get)
+        new = self._records(new_leaves, get)
+        changes = {}
+        for name in sorted(old.keys() | new.keys()):
+            if old.get(name) == new.get(name):
+                continue
+            changes[name] = (old.get(name) and get(old[name]),
+                             new.get(name) and get(new[name]))
+        return changes
+
+    def restore(self, ab, number: int) -> int:
+        """Makes records of ab the same as in version.
+        Returns number of changed records"""
+        changes = self.diff(number, ab)
+        for (name, (old, new)) in changes.items():
+            if old is None:
+                del ab[Name(name)]
+            else:
+                ab[name] = tuple(tuple(pair) for pair in old)
+        if bool(changes):
+            ab.is_modified = True
+        return len(changes)
+
+
+if __name__ == "__main__":
+    # Growth of history by version of a few changed records
+    import tempfile
+    import time
+    from addressbook import AddressBook
+
+    def letters(number: int) -> str:
+        word = ""
+        for __ in range(4):
+            (number, ix) = divmod(number, 32)
+            word += chr(ord("а") + ix)
+        return word.capitalize()
+
+    def size_of(path) -> int:
+        return sum(path.stat().st_size for path in Path(path).rglob("*")
+                   if path.is_file())
+
+    for count in (1000, 100000):
+        ab = AddressBook(tuple(
+            (f"Абонент {letters(ix)}",
+             ("Phone", f"111-{ix // 100:03d}-{ix % 100:02d}"))
+            for ix in range(count)))
+        with tempfile.TemporaryDirectory() as tmp:
+            history = BookHistory(tmp)
+            history.commit(ab)
+            size = size_of(tmp)
+            # Bad bulk change of a few records
+            for name in tuple(ab.keys())[:3]:
+                ab[name].change("Phone", "999-99-99")
+            del ab[tuple(ab.keys())[-1]]
+            # Texts are kept by SharedBook after save
+            texts = BookHistory.texts_of(ab)
+            start = time.perf_counter()
+            history.commit(ab, texts=texts)
+            seconds = time.perf_counter() - start
+            grown = size_of(tmp) - size
+            print(f"{count} records: version 1 {size} bytes, version 2 "
+                  f"{grown} bytes ({grown // 4} per changed record), "
+                  f"commit {seconds:.2f} s")
+            print(f"  changed in version 2: {len(history.diff(1))}")
+            print(f"  restored: {history.restore(ab, 1)} record(s)")
+            assert history.diff(1, ab) == {}
+            assert history.records(1) == {
+                name: [list(pair) for pair in rec_list]
+                for (name, rec_list) in ab.JSON_helper().items()}
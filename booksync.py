@@ -0,0 +1,244 @@
+"""Offline delta sync between address books
+
+Author: Dmytro Tarasiuk
+URL: https://github.com/RoyBebru/addressbook
+Email: RoyBebru@gmail.com
+License: MIT
+
+Each book is summarized by MerkleTree of record digests. Comparing two
+trees from the root descends only into differing nodes, so a few
+changed records are found with a few comparisons. Only these records
+are sent in a delta file:
+    machine B> sync summary b.abt        summary of book B
+    machine A> sync delta b.abt a.abd    records which B lacks
+    machine B> sync apply a.abd          merge them into B
+Both books are local files:
+    > sync other.abo
+Delta is merged by Record semantics: absent record is added, absent
+multi-valued field (Phone, Address, ...) is added, different unique
+field (Birthday) is kept and reported as conflict. Deleted records
+are not propagated: there is no common base version of the books.
+"""
+
+
+import hashlib
+import json
+
+from name import Name
+
+
+class SyncException(Exception):
+    def __init__(self, *args, **kwargs):
+        # Call parent constructor
+        super(Exception, self).__init__(*args, **kwargs)
+
+
+def record_digest(record) -> str:
+    """Digest does not depend on field order"""
+    return hashlib.sha1(json.dumps(sorted(record.as_tuple_of_tuples()),
+                                   ensure_ascii=False).encode("utf-8")
+                        ).hexdigest()[:16]
+
+
+class MerkleTree:
+    """Hex digit tree: level d has 16**d nodes, leaf of record is
+    chosen by the first depth hex digits of its name hash"""
+    fanout = 16
+    max_depth = 4
+    # Desired records in leaf
+    leaf_size = 8
+
+    def __init__(self, digests: dict, depth=None):
+        """digests: name -> record digest"""
+        if depth is None:
+            depth = 1
+            while depth < MerkleTree.max_depth and \
+                    MerkleTree.fanout ** depth * MerkleTree.leaf_size \
+                    < len(digests):
+                depth += 1
+        self.depth = depth
+        self.leaves = [{} for __ in range(MerkleTree.fanout ** depth)]
+        for (name, digest) in digests.items():
+            self.leaves[MerkleTree.leaf_of(name, depth)][name] = digest
+        level = [MerkleTree._hash(json.dumps(sorted(leaf.items()),
+                                             ensure_ascii=False))
+                 for leaf in self.leaves]
+        self.levels = [level]
+        while len(level) > 1:
+            level = [MerkleTree._hash("".join(
+                level[ix:ix + MerkleTree.fanout]))
+                for ix in range(0, len(level), MerkleTree.fanout)]
+            self.levels.insert(0, level)
+
+    @staticmethod
+    def _hash(text: str) -> str:
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+    @staticmethod
+    def leaf_of(name: str, depth: int) -> int:
+        return int(hashlib.sha1(name.encode("utf-8")).hexdigest()[:depth], 16)
+
+    @classmethod
+    def from_book(cls, ab, depth=None):
+        return cls({str(name): record_digest(ab.data[name])
+                    for name in ab.keys()}, depth)
+
+    def diff(self, other) -> tuple:
+        """Returns (names which differ, number of node comparisons)"""
+        if self.depth != other.depth:
+            raise SyncException("trees of different depth")
+        comparisons = 0
+        nodes = [0] # differing nodes of level
+        for level in range(len(self.levels)):
+            children = []
+            for ix in nodes:
+                comparisons += 1
+                if self.levels[level][ix] != other.levels[level][ix]:
+                    children.extend(range(ix * MerkleTree.fanout,
+                                          (ix + 1) * MerkleTree.fanout))
+            nodes = children
+            if len(nodes) == 0:
+                return ((), comparisons)
+        names = set()
+        # Nodes of the last level are differing leaves
+        for ix in set(child // MerkleTree.fanout for child in nodes):
+            (leaf, other_leaf) = (self.leaves[ix], other.leaves[ix])
+            for name in leaf.keys() | other_leaf.keys():
+                comparisons += 1
+                if leaf.get(name) != other_leaf.get(name):
+                    names.add(name)
+        return (tuple(sorted(names)), comparisons)
+
+    def as_dict(self) -> dict:
+        return {"depth": self.depth, "levels": self.levels,
+                "leaves": self.leaves}
+
+    @classmethod
+    def from_dict(cls, summary: dict):
+        tree = cls.__new__(cls)
+        try:
+            tree.depth = summary["depth"]
+            tree.levels = summary["levels"]
+            tree.leaves = summary["leaves"]
+        except (KeyError, TypeError):
+            raise SyncException("wrong summary format")
+        return tree
+
+
+def make_delta(ab, names) -> dict:
+    """Records of ab with such names: name -> [[title, value], ...]"""
+    delta = {}
+    for name in names:
+        key = Name(name)
+        if key in ab.data:
+            delta[name] = [list(pair) for pair
+                           in ab.data[key].as_tuple_of_tuples()]
+    return delta
+
+
+def apply_delta(ab, delta: dict) -> tuple:
+    """Merges delta into ab. Returns (added names, merged names,
+    conflicts as (name, title, value) of not accepted unique fields)"""
+    added = ()
+    merged = ()
+    conflicts = ()
+    for (name, record_list_of_list) in delta.items():
+        key = Name(name)
+        pairs = tuple((pair[0], pair[1]) for pair in record_list_of_list)
+        if key not in ab.data:
+            ab[name] = pairs
+            added += (name,)
+            continue
+        record = ab.data[key]
+        before = record_digest(record)
+        conflicts += tuple((name, title, value)
+                           for (title, value) in record.merge(pairs))
+        if record_digest(record) != before:
+            merged += (name,)
+            ab.is_modified = True
+    return (added, merged, conflicts)
+
+
+def write_json(pathfile, content):
+    try:
+        with open(pathfile, "w") as fh:
+            fh.write(json.dumps(content, ensure_ascii=False))
+    except OSError as e:
+        raise SyncException(f"can not write '{pathfile}': {e.strerror}")
+
+
+def read_json(pathfile):
+    try:
+        with open(pathfile, "r") as fh:
+            return json.loads(fh.read())
+    except OSError as e:
+        raise SyncException(f"can not read '{pathfile}': {e.strerror}")
+    except ValueError:
+        raise SyncException(f"wrong format of '{pathfile}'")
+
+
+def delta_for(ab, summary: dict) -> tuple:
+    """Returns (delta with records which summary side lacks,
+    number of node comparisons)"""
+    other = MerkleTree.from_dict(summary)
+    tree = MerkleTree.from_book(ab, other.depth)
+    (names, comparisons) = tree.diff(other)
+    return (make_delta(ab, names), comparisons)
+
+
+def sync_books(ab, other_ab) -> tuple:
+    """Two-way merge of books in memory.
+    Returns (apply_delta() result of ab, of other_ab, comparisons)"""
+    tree = MerkleTree.from_book(ab)
+    other = MerkleTree.from_book(other_ab)
+    if tree.depth != other.depth:
+        depth = max(tree.depth, other.depth)
+        tree = MerkleTree.from_book(ab, depth)
+        other = MerkleTree.from_book(other_ab, depth)
+    (names, comparisons) = tree.diff(other)
+    delta = make_delta(ab, names)
+    other_delta = make_delta(other_ab, names)
+    return (apply_delta(ab, other_delta), apply_delta(other_ab, delta),
+            comparisons)
+
+
+if __name__ == "__main__":
+    # Sync of two local files
+    from pathlib import Path
+    import tempfile
+    from addressbook import AddressBook
+    from sharedbook import SharedBook
+
+    common = tuple(("Спільний Запис" + suffix,
+                    ("Phone", "111-22-3%d" % ix))
+                   for (ix, suffix) in enumerate(("", "ович", "енко")))
+    with tempfile.TemporaryDirectory() as tmp:
+        (path_a, path_b) = (Path(tmp) / "a.abo", Path(tmp) / "b.abo")
+        SharedBook(path_a).save(AddressBook(common + (
+            ("Тільки Перший", ("Phone", "222-22-22")),
+            ("Змінений Запис", ("Phone", "333-33-33"),
+             ("Birthday", "01.01.1990")),
+        )))
+        SharedBook(path_b).save(AddressBook(common + (
+            ("Тільки Другий", ("Phone", "444-44-44")),
+            ("Змінений Запис", ("Phone", "555-55-55"),
+             ("Birthday", "02.02.1990")),
+        )))
+        (shared_a, shared_b) = (SharedBook(path_a), SharedBook(path_b))
+        (ab_a, ab_b) = (AddressBook(shared_a.load()),
+                        AddressBook(shared_b.load()))
+        (result_a, result_b, comparisons) = sync_books(ab_a, ab_b)
+        shared_a.save(ab_a)
+        shared_b.save(ab_b)
+        print(f"comparisons: {comparisons}")
+        print(f"a: added {result_a[0]}, merged {result_a[1]}, "
+              f"conflicts {result_a[2]}")
+        print(f"b: added {result_b[0]}, merged {result_b[1]}, "
+              f"conflicts {result_b[2]}")
+        (ab_a, ab_b) = (AddressBook(SharedBook(path_a).load()),
+                        AddressBook(SharedBook(path_b).load()))
+        assert set(str(name) for name in ab_a.keys()) \
+            == set(str(name) for name in ab_b.keys())
+        assert len(ab_a[Name("Змінений Запис")].fields) == 3
+        assert sync_books(ab_a, ab_b)[0][:2] == ((), ())
+        print("books are in sync")
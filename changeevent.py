@@ -0,0 +1,94 @@
+"""Change events of AddressBook and Record
+
+Author: Dmytro Tarasiuk
+URL: https://github.com/RoyBebru/addressbook
+Email: RoyBebru@gmail.com
+License: MIT
+
+Every mutation of address book emits one of events below. Event
+calls the relevant handler of index by dispatch(index).
+"""
+
+
+from abc import ABC, abstractmethod
+
+
+class ChangeEvent(ABC):
+
+    @abstractmethod
+    def dispatch(self, index):
+        pass
+
+    def __repr__(self):
+        return "%s(%s)" % (type(self).__name__, ", ".join(
+            f"{key}={value}" for (key, value) in vars(self).items()))
+
+
+class BookCleared(ChangeEvent):
+
+    def dispatch(self, index):
+        index.clear()
+
+
+class RecordAdded(ChangeEvent):
+
+    def __init__(self, name, record):
+        self.name = name
+        self.record = record
+
+    def dispatch(self, index):
+        index.on_record_added(self.name, self.record)
+
+
+class RecordRemoved(ChangeEvent):
+
+    def __init__(self, name, record):
+        self.name = name
+        self.record = record
+
+    def dispatch(self, index):
+        index.on_record_removed(self.name, self.record)
+
+
+class RecordRenamed(ChangeEvent):
+    """name is already renamed, old_name is str"""
+
+    def __init__(self, old_name: str, name, record):
+        self.old_name = old_name
+        self.name = name
+        self.record = record
+
+    def dispatch(self, index):
+        index.on_record_renamed(self.old_name, self.name, self.record)
+
+
+class RecordChanged(ChangeEvent):
+    """Fields of record are changed"""
+
+    def __init__(self, record):
+        self.record = record
+
+    def dispatch(self, index):
+        index.on_record_changed(self.record)
+
+
+class FieldAdded(RecordChanged):
+
+    def __init__(self, record, field):
+        super().__init__(record)
+        self.field = field
+
+
+class FieldChanged(RecordChanged):
+
+    def __init__(self, record, field, old_value: str):
+        super().__init__(record)
+        self.field = field
+        self.old_value = old_value
+
+
+class FieldRemoved(RecordChanged):
+
+    def __init__(self, record, field):
+        super().__init__(record)
+        self.field = field
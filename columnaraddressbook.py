@@ -0,0 +1,436 @@
+"""Class ColumnarAddressBook
+
+Author: Dmytro Tarasiuk
+URL: https://github.com/RoyBebru/addressbook
+Email: RoyBebru@gmail.com
+License: MIT
+"""
+
+
+from array import array
+from bisect import bisect_left, bisect_right
+import copy
+import os
+import re
+
+from addressbook import AddressBook, AddressBookException
+from name import Name
+from phone import Phone
+from phoneindex import PhoneIndex
+from record import Record
+
+
+class ColumnarAddressBook:
+    """Address book kept in columns instead of Name and Record objects.
+    Each field is a row: field code and offset of its value in one
+    packed UTF-8 buffer, and record id is the first row of record. Rows
+    of record are contiguous and sorted as record reports them. Phone
+    digits and lowercased values are packed too, so phone and substring
+    scans go over contiguous buffers.
+
+    Record is validated when it is added. Name and Record objects are
+    made on demand only: change of got record is written back. Changed
+    or deleted record leaves dead rows which are dropped by compact().
+    """
+    titles = ("Name",) + tuple(Record.known_field_titles.keys())
+    codes = {title: code for (code, title) in enumerate(titles)}
+    # Stored name is proven already: copy of it gets the value
+    name_prototype = Name("Name")
+    # Value separator of folded buffer: substring can not cross values
+    separator = b"\x00"
+    # Marks of hash table slot
+    free = -1
+    deleted = -2
+
+    def __init__(self, records=()):
+        """records are in AddressBook constructor format"""
+        self._clear()
+        if len(records) > 0:
+            self[None] = records
+        self.is_modified = False
+
+    def _clear(self):
+        # Row columns
+        self.row_codes = array("B")
+        self.offsets = array("I", (0,))
+        self.values = bytearray()
+        # Lowercased values for substring scan: they are packed on
+        # the first scan after change. Row starts at folded_offsets[row]
+        self.folded_offsets = None
+        self.folded = None
+        # Record columns: the first row and liveness
+        self.first_rows = array("I")
+        self.alive = bytearray()
+        self.count = 0
+        # Digits of phones "\n380671112233\n..." and record of each phone
+        self.phone_digits = bytearray(b"\n")
+        self.phone_starts = array("I")
+        self.phone_records = array("I")
+        # Open addressing hash table of names: record id, free or deleted
+        self.slots = array("i", (ColumnarAddressBook.free,) * 8)
+        self.used_slots = 0
+
+    # Columns
+
+    def _rows(self, rid) -> range:
+        last = self.first_rows[rid + 1] if rid + 1 < len(self.first_rows) \
+               else len(self.row_codes)
+        return range(self.first_rows[rid], last)
+
+    def _value(self, row) -> str:
+        return self.values[self.offsets[row]:self.offsets[row + 1]] \
+                   .decode("utf-8")
+
+    def _pairs(self, rid) -> tuple:
+        """(title, value) of fields without name"""
+        return tuple((ColumnarAddressBook.titles[self.row_codes[row]],
+                      self._value(row))
+                     for row in self._rows(rid)[1:])
+
+    @staticmethod
+    def _name_of(value: str) -> Name:
+        name = copy.copy(ColumnarAddressBook.name_prototype)
+        name._value = value
+        return name
+
+    def _name(self, rid) -> Name:
+        return ColumnarAddressBook._name_of(self._value(self.first_rows[rid]))
+
+    @staticmethod
+    def _canonical(name) -> str:
+        return " ".join(sorted(str(name).lower().split()))
+
+    def _rid_canonical(self, rid) -> str:
+        return ColumnarAddressBook._canonical(
+            self._value(self.first_rows[rid]))
+
+    def _slot(self, canonical: str) -> int:
+        """Slot of name or the first free slot of its probe sequence"""
+        mask = len(self.slots) - 1
+        ix = hash(canonical) & mask
+        while True:
+            rid = self.slots[ix]
+            if rid == ColumnarAddressBook.free or (
+                    rid != ColumnarAddressBook.deleted
+                    and self._rid_canonical(rid) == canonical):
+                return ix
+            ix = (ix + 1) & mask
+
+    def _rehash(self):
+        size = 8
+        while size < self.count * 4:
+            size *= 2
+        self.slots = array("i", (ColumnarAddressBook.free,) * size)
+        self.used_slots = self.count
+        mask = size - 1
+        for rid in range(len(self.first_rows)):
+            if self.alive[rid]:
+                ix = hash(self._rid_canonical(rid)) & mask
+                while self.slots[ix] != ColumnarAddressBook.free:
+                    ix = (ix + 1) & mask
+                self.slots[ix] = rid
+
+    def _find(self, name):
+        """Record id of name or None"""
+        rid = self.slots[self._slot(ColumnarAddressBook._canonical(name))]
+        return None if rid == ColumnarAddressBook.free else rid
+
+    def _rid(self, name):
+        rid = self._find(name)
+        if rid is None:
+            raise KeyError(str(name))
+        return rid
+
+    def _pack(self, rid, code, value: str):
+        self.row_codes.append(code)
+        self.values += value.encode("utf-8")
+        self.offsets.append(len(self.values))
+        self.folded = None
+
+    def _attach(self, name: Name, record: Record):
+        """Each record gets into address book here: it is packed"""
+        present = self._find(name)
+        if present is not None:
+            self._remove(present)
+        rid = len(self.first_rows)
+        self.first_rows.append(len(self.row_codes))
+        self.alive.append(1)
+        self.count += 1
+        self._pack(rid, 0, str(name))
+        for field in record.sort_fields():
+            self._pack(rid, ColumnarAddressBook.codes[field.title],
+                       str(field))
+            if isinstance(field, Phone):
+                self.phone_starts.append(len(self.phone_digits))
+                self.phone_records.append(rid)
+                self.phone_digits += PhoneIndex.digits(field).encode("ascii")
+                self.phone_digits += b"\n"
+        ix = self._slot(ColumnarAddressBook._canonical(name))
+        self.slots[ix] = rid
+        self.used_slots += 1
+        if self.used_slots * 2 > len(self.slots):
+            self._rehash()
+
+    def _remove(self, rid):
+        """Rows stay in columns as dead ones"""
+        self.slots[self._slot(self._rid_canonical(rid))] = \
+            ColumnarAddressBook.deleted
+        self.alive[rid] = 0
+        self.count -= 1
+
+    def _fold(self):
+        self.folded_offsets = array("I")
+        self.folded = bytearray()
+        for row in range(len(self.row_codes)):
+            self.folded_offsets.append(len(self.folded))
+            self.folded += self._value(row).lower().encode("utf-8")
+            self.folded += ColumnarAddressBook.separator
+
+    def compact(self):
+        """Drops rows of changed and deleted records"""
+        records = self[None]
+        self._clear()
+        for (name, pairs) in records:
+            self._attach(ColumnarAddressBook._name_of(name), Record(pairs))
+
+    def _live(self, rids):
+        """Names of live records without duplicates keeping order"""
+        names = []
+        last = None
+        for rid in rids:
+            if rid != last and self.alive[rid]:
+                names.append(self._name(rid))
+            last = rid
+        return tuple(names)
+
+    # Mapping
+
+    def __len__(self):
+        return self.count
+
+    def keys(self):
+        return self._live(range(len(self.first_rows)))
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __contains__(self, name):
+        return self._find(name) is not None
+
+    def get(self, name, default=None):
+        if name in self:
+            return self[name]
+        return default
+
+    def __getitem__(self, key):
+        """The same as AddressBook.__getitem__(). Record of Name key is
+        made from columns, and its change is written back"""
+        if key is None:
+            return tuple((self._value(self.first_rows[rid]), self._pairs(rid))
+                         for rid in range(len(self.first_rows))
+                         if self.alive[rid])
+        elif isinstance(key, Name):
+            rid = self._rid(key)
+            name = self._name(rid)
+            record = Record(self._pairs(rid))
+            record.observers.append(
+                lambda event: name in self and self._attach(name, record))
+            return record
+        elif isinstance(key, str):
+            return tuple(name for name in self.keys() if name.is_substr(key))
+        raise AddressBookException(f"unsopported key {key}")
+
+    def __setitem__(self, key, value):
+        """The same as AddressBook.__setitem__()"""
+        if key is None:
+            if len(value) == 0:
+                self._clear()
+                self.is_modified = True
+                return
+            if isinstance(value, tuple) or isinstance(value, list):
+                if isinstance(value[0], str):
+                    value = (value,)
+                for item in value:
+                    if not isinstance(item[0], str):
+                        raise AddressBookException(
+                            f"absent required name as "
+                            f"the first item in {item}")
+                    self._attach(Name(item[0]), Record(item[1:]))
+                    self.is_modified = True
+                return
+            raise AddressBookException(f"not supported value {value}")
+        if isinstance(key, str):
+            key = Name(key)
+        if not isinstance(key, Name):
+            raise AddressBookException(f"not supported key {key}")
+        if isinstance(value, tuple) or isinstance(value, list):
+            self._attach(key, Record(value))
+        elif isinstance(value, Record):
+            self._attach(key, value)
+        elif isinstance(value, str):
+            if key != value and value in self:
+                raise AddressBookException(f"name '{value}' already exists")
+            rid = self._rid(key)
+            pairs = self._pairs(rid)
+            self._remove(rid)
+            key.value = value
+            self._attach(key, Record(pairs))
+        else:
+            raise AddressBookException(f"not supported value {value}")
+        self.is_modified = True
+
+    def __delitem__(self, key):
+        self._remove(self._rid(key))
+        self.is_modified = True
+
+    # Reports
+
+    _sample_to_regex = AddressBook._sample_to_regex
+
+    def report(self, names=None, index=1):
+        if names is None:
+            names = self.keys()
+        elif isinstance(names, Name):
+            names = (names,)
+        if isinstance(names, tuple) or isinstance(names, list):
+            index -= 1
+            indent = len(str(len(names)))
+            name_format = f"#%-{indent}d %s: %s"
+            field_format = os.linesep + " " * (indent + len("# ")) + "%s: %s"
+            return (os.linesep * 2).join(
+                name_format % (index := index + 1, name.title, str(name))
+                + "".join(field_format % pair
+                          for pair in self._pairs(self._rid(name)))
+                for name in names)
+        return ""
+
+    def JSON_helper(self, names=None):
+        if names is None:
+            names = self.keys()
+        ab = {}
+        for name in names:
+            rec_list = list(self._pairs(self._rid(name)))
+            rec_list.sort(reverse=True, key=lambda it: it[0])
+            ab[str(name)] = rec_list
+        return ab
+
+    # Scans
+
+    def phone_keys(self, phone: str) -> tuple:
+        """Names with phone equal to phone or, when phone ends
+        with '*', starting with its digits"""
+        needle = b"\n" + PhoneIndex.digits(phone).encode("ascii")
+        if not phone.endswith('*'):
+            needle += b"\n"
+        rids = []
+        pos = self.phone_digits.find(needle)
+        while pos != -1:
+            rids.append(self.phone_records[
+                bisect_left(self.phone_starts, pos + 1)])
+            pos = self.phone_digits.find(needle, pos + 1)
+        return self._live(sorted(rids))
+
+    def search(self, text: str) -> tuple:
+        """Names of records with text in any field ignoring case"""
+        needle = text.lower().encode("utf-8")
+        if not bool(needle):
+            return self.keys()
+        if self.folded is None:
+            self._fold()
+        rids = []
+        pos = self.folded.find(needle)
+        while pos != -1:
+            row = bisect_right(self.folded_offsets, pos) - 1
+            rid = bisect_right(self.first_rows, row) - 1
+            rids.append(rid)
+            # The rest of record is skipped
+            rows = self._rows(rid)
+            if rows.stop >= len(self.folded_offsets):
+                break
+            pos = self.folded.find(needle, self.folded_offsets[rows.stop])
+        return self._live(rids)
+
+    def iter_by_sample(self, sample: str, names=None):
+        if names is None:
+            names = self.keys()
+        elif isinstance(names, Name):
+            names = (names,)
+        try:
+            rex = re.compile(self._sample_to_regex(sample),
+                             re.IGNORECASE|re.MULTILINE)
+        except re.error:
+            raise AddressBookException("error sample in metasymbols")
+        for (index, name) in enumerate(names, start=1):
+            if rex.search(self.report([name], index=index)):
+                yield name
+
+
+if __name__ == "__main__":
+    # Memory per contact and scan speed against AddressBook
+    import time
+    import tracemalloc
+
+    def letters(number: int) -> str:
+        word = ""
+        for __ in range(4):
+            (number, ix) = divmod(number, 32)
+            word += chr(ord("а") + ix)
+        return word.capitalize()
+
+    count = 50000
+    records = tuple((f"Абонент {letters(ix)}",
+                     ("Phone", f"+38 (067) {ix // 100:03d}-{ix % 100:02d}-11"),
+                     ("Phone", f"044 {ix % 1000:03d}-{ix // 1000:02d}-22"),
+                     ("Address", f"вул. Остробрамська {ix % 200}, кв. {ix}"))
+                    for ix in range(count))
+
+    books = {}
+    for (title, make) in (
+            ("AddressBook with indexes", lambda: AddressBook(records)),
+            ("AddressBook", lambda: AddressBook(records, build_indexes=False)),
+            ("ColumnarAddressBook", lambda: ColumnarAddressBook(records))):
+        tracemalloc.start()
+        start = time.perf_counter()
+        books[title] = make()
+        seconds = time.perf_counter() - start
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(f"{title}: {size / count:.0f} bytes per contact, "
+              f"built in {seconds:.2f} s")
+    (__, ab, cab) = books.values()
+
+    start = time.perf_counter()
+    expected = tuple(name for name in ab.keys()
+                     if any(isinstance(field, Phone)
+                            and PhoneIndex.digits(field).startswith("3806701")
+                            for field in ab[name].fields))
+    print(f"phone prefix, objects: {time.perf_counter() - start:.3f} s")
+    start = time.perf_counter()
+    found = cab.phone_keys("+38 (067) 01*")
+    print(f"phone prefix, columns: {time.perf_counter() - start:.3f} s")
+    assert tuple(map(str, found)) == tuple(map(str, expected))
+
+    start = time.perf_counter()
+    expected = tuple(name for name in ab.keys()
+                     if any("кв. 1234" in str(field).lower()
+                            for field in ab[name].fields))
+    print(f"substring, objects: {time.perf_counter() - start:.3f} s")
+    for scan in ("first (values are folded)", "next"):
+        start = time.perf_counter()
+        found = cab.search("КВ. 1234")
+        print(f"substring, columns, {scan}: "
+              f"{time.perf_counter() - start:.3f} s")
+    assert tuple(map(str, found)) == tuple(map(str, expected))
+
+    names = ab.keys()[:100]
+    assert cab.JSON_helper(names) == ab.JSON_helper(names)
+    assert cab.report(names) == ab.report(names)
+    # Change of got record is written back
+    name = Name("абонент Бааа")
+    cab[name].change("Phone", "111-22-33")
+    del cab[Name("Абонент Аааа")]
+    cab["Абонент Вааа"] = "Абонент Новий"
+    cab.compact()
+    assert cab.phone_keys("111-22-33")[0] == name
+    assert len(cab) == count - 1 and "Абонент Новий" in cab
+    print("Columns serve the same records")
@@ -0,0 +1,155 @@
+"""Streaming export of address book
+
+Author: Dmytro Tarasiuk
+URL: https://github.com/RoyBebru/addressbook
+Email: RoyBebru@gmail.com
+License: MIT
+
+Records go through generator pipeline one at a time:
+    iter_records() -> csv_lines() / vcard_lines() / ndjson_lines() -> file
+so memory use does not depend on address book size.
+"""
+
+
+import csv
+import io
+import json
+from pathlib import Path
+
+from record import Record
+
+
+class ExportException(Exception):
+    def __init__(self, *args, **kwargs):
+        # Call parent constructor
+        super(Exception, self).__init__(*args, **kwargs)
+
+
+def iter_records(ab, names=None):
+    """Yields (name, ((title, value), ...)) with fields in report order"""
+    if names is None:
+        names = ab.keys()
+    for name in names:
+        yield (str(name), tuple((field.title, str(field))
+                                for field in ab.data[name].sort_fields()))
+
+
+def csv_lines(records):
+    """One row per record, multiple field values are separated by newline"""
+    titles = tuple(Record.known_field_titles.keys())
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def line(row):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(row)
+        return buffer.getvalue()
+
+    yield line(("Name",) + titles)
+    for (name, fields) in records:
+        yield line((name,) + tuple(
+            "\n".join(value for (title, value) in fields if title == column)
+            for column in titles))
+
+
+def _vcard_escape(text: str) -> str:
+    return (text.replace("\\", "\\\\").replace(",", "\\,")
+            .replace(";", "\\;").replace("\n", "\\n"))
+
+
+def _vcard_fold(line: str) -> str:
+    """Folds content line to 75 octets (RFC 2425), never splitting
+    a multibyte UTF-8 character"""
+    parts = []
+    size = 0
+    start = 0
+    for (ix, char) in enumerate(line):
+        char_size = len(char.encode("utf-8"))
+        if size + char_size > 75:
+            parts.append(line[start:ix])
+            start = ix
+            size = 1 # folded line starts with space
+        size += char_size
+    parts.append(line[start:])
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def vcard_lines(records):
+    """vCard 3.0 (RFC 2426): name words are 'Family Given Additional'"""
+    for (name, fields) in records:
+        words = name.split(' ')
+        words = (words + ["", "", ""])[:3]
+        lines = ["BEGIN:VCARD", "VERSION:3.0",
+                 "FN:" + _vcard_escape(name),
+                 "N:" + ";".join(_vcard_escape(word) for word in words) + ";;"]
+        for (title, value) in fields:
+            if title == "Phone":
+                lines.append("TEL;TYPE=VOICE:" + _vcard_escape(value))
+            elif title == "Birthday":
+                if bool(value):
+                    (day, month, year) = value.split(".")
+                    lines.append(f"BDAY:{year}-{month}-{day}")
+            elif title == "Address":
+                lines.append("ADR;TYPE=HOME:;;" + _vcard_escape(value)
+                             + ";;;;")
+            elif title == "Comment":
+                lines.append("NOTE:" + _vcard_escape(value))
+        lines.append("END:VCARD")
+        yield "".join(_vcard_fold(line) for line in lines)
+
+
+def ndjson_lines(records):
+    """One JSON object per line in the same form as in address book file"""
+    for (name, fields) in records:
+        yield json.dumps({name: fields}, ensure_ascii=False) + "\n"
+
+
+FORMATS = {
+    "csv": csv_lines,
+    "vcard": vcard_lines,
+    "vcf": vcard_lines,
+    "ndjson": ndjson_lines,
+    "jsonl": ndjson_lines,
+}
+
+
+def export(ab, path, fmt=None, names=None) -> int:
+    """Writes records to file. Format is taken from file suffix
+    if it is not given. Returns number of exported records"""
+    path = Path(path)
+    if fmt is None:
+        fmt = path.suffix[1:]
+    try:
+        formatter = FORMATS[fmt.lower()]
+    except KeyError:
+        raise ExportException(f"unknown export format '{fmt}'")
+    count = 0
+
+    def counted(records):
+        nonlocal count
+        for record in records:
+            count += 1
+            yield record
+
+    try:
+        with open(path, "w", encoding="utf-8", newline="") as fh:
+            for line in formatter(counted(iter_records(ab, names))):
+                fh.write(line)
+    except OSError as e:
+        raise ExportException(f"can not write '{path}': {e.strerror}")
+    return count
+
+
+if __name__ == "__main__":
+    import sys
+    from addressbook import AddressBook
+    ab = AddressBook((
+        ("Кузьо Мартін Йогович", ("Phone", "111-22-33"),
+         ("Birthday", "10.11.1990"), ("Address", "Остробрамська 10, кв. 171"),
+         ("Comment", "Дуже довгий коментар, який не вміщається в один "
+                     "рядок vCard; треба переносити")),
+    ))
+    for fmt in ("csv", "vcard", "ndjson"):
+        for line in FORMATS[fmt](iter_records(ab)):
+            sys.stdout.write(line)
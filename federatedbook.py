@@ -0,0 +1,318 @@
+"""Class FederatedBook
+
+Author: Dmytro Tarasiuk
+URL: https://github.com/RoyBebru/addressbook
+Email: RoyBebru@gmail.com
+License: MIT
+"""
+
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+from pathlib import Path
+import re
+
+from addressbook import AddressBook, AddressBookException
+from name import Name
+from sharedbook import SharedBook
+from sortednames import SortedNames
+from transaction import Transaction
+
+
+class FederatedBook:
+    """A few address books as one. Search is fanned out to all books
+    by thread pool and results are merged. Each name of result is the
+    Name object of its book, so a change of record goes to the book
+    which the record came from. New record is added to the first book.
+    """
+
+    def __init__(self, books: dict, workers=None):
+        """books: tag -> AddressBook"""
+        if len(books) == 0:
+            raise AddressBookException("at least one book is required")
+        self.books = books
+        self.primary = next(iter(books.keys()))
+        # SharedBook of each book if books are files
+        self.shared = {}
+        self.pool = ThreadPoolExecutor(max_workers=workers or len(books))
+        # id(Name) -> (Name, tag of book): Name is kept, so its id is
+        # not reused by other object while it is in cache
+        self.tags = {}
+        self._is_modified = False
+
+    @classmethod
+    def open(cls, paths, workers=None):
+        """Loads book files in parallel. Tag is file name without
+        suffix"""
+        tags = {}
+        for path in map(Path, paths):
+            tag = path.stem
+            while tag in tags:
+                tag += "+"
+            tags[tag] = SharedBook(path)
+        with ThreadPoolExecutor(max_workers=workers or len(tags)) as pool:
+            books = dict(zip(tags.keys(), pool.map(
+                lambda shared: AddressBook(shared.load()), tags.values())))
+        federated = cls(books, workers)
+        federated.shared = tags
+        return federated
+
+    def _map(self, method, *args) -> dict:
+        """Calls method of each book in parallel: tag -> result"""
+        futures = {tag: self.pool.submit(getattr(book, method), *args)
+                   for (tag, book) in self.books.items()}
+        return {tag: future.result() for (tag, future) in futures.items()}
+
+    def _merge(self, results: dict) -> tuple:
+        """Names of all books in book order"""
+        names = ()
+        for (tag, book_names) in results.items():
+            for name in book_names:
+                self.tags[id(name)] = (name, tag)
+            names += tuple(book_names)
+        return names
+
+    def tag_of(self, name):
+        (cached, tag) = self.tags.get(id(name), (None, None))
+        if cached is name and name in self.books[tag].data:
+            return tag
+        for (tag, book) in self.books.items():
+            if any(key is name for key in book.data.keys()):
+                self.tags[id(name)] = (name, tag)
+                return tag
+        raise KeyError(str(name))
+
+    def book_of(self, name):
+        return self.books[self.tag_of(name)]
+
+    @property
+    def is_modified(self) -> bool:
+        return self._is_modified or any(book.is_modified
+                                        for book in self.books.values())
+
+    @is_modified.setter
+    def is_modified(self, value: bool):
+        # Record can be changed directly: changed books are found on save
+        self._is_modified = value
+        if not value:
+            for book in self.books.values():
+                book.is_modified = False
+
+    @property
+    def indexes(self) -> dict:
+        return {f"{tag}:{name}": index for (tag, book) in self.books.items()
+                for (name, index) in book.indexes.items()}
+
+    def __len__(self):
+        return sum(len(book) for book in self.books.values())
+
+    def keys(self):
+        return self._merge({tag: book.keys()
+                            for (tag, book) in self.books.items()})
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __contains__(self, name):
+        return any(name in book for book in self.books.values())
+
+    def __getitem__(self, key):
+        if isinstance(key, Name):
+            return self.book_of(key)[key]
+        if isinstance(key, str):
+            # Names with such words
+            return self._merge(self._map("__getitem__", key))
+        raise AddressBookException(f"unsopported key {key}")
+
+    def __setitem__(self, key, value):
+        if isinstance(key, Name):
+            try:
+                # Record of some book is renamed or replaced
+                self.book_of(key)[key] = value
+                return
+            except KeyError:
+                pass
+        # New record
+        self.books[self.primary][key] = value
+
+    def report(self, names=None, index=1):
+        if names is None:
+            names = self.keys()
+        elif isinstance(names, Name):
+            names = (names,)
+        indent = len(str(index - 1 + len(names))) + len("# ")
+        return (os.linesep * 2).join(
+            f"#{number:<{indent - 2}d} [{self.tag_of(name)}] "
+            f"{name.title}: {name}" + self.book_of(name)[name].report(indent)
+            for (number, name) in enumerate(names, start=index))
+
+    def _split(self, names) -> dict:
+        """tag -> (number, name) of book keeping order. Number is
+        position of name in names as report() shows it"""
+        parts = {tag: [] for tag in self.books.keys()}
+        for (number, name) in enumerate(names, start=1):
+            parts[self.tag_of(name)].append((number, name))
+        return parts
+
+    def _match(self, rex, part) -> tuple:
+        return tuple(name for (number, name) in part
+                     if rex.search(self.report(name, index=number)))
+
+    def iter_by_sample(self, sample: str, names=None):
+        """Record is matched as report() of all names shows it: with
+        its number in names and tag of its book"""
+        if names is None:
+            names = self.keys()
+        elif isinstance(names, Name):
+            names = (names,)
+        try:
+            rex = re.compile(
+                self.books[self.primary]._sample_to_regex(sample),
+                re.IGNORECASE|re.MULTILINE)
+        except re.error:
+            raise AddressBookException("error sample in metasymbols")
+        futures = [self.pool.submit(self._match, rex, part)
+                   for part in self._split(names).values() if len(part) > 0]
+        found = set()
+        for future in futures:
+            found.update(id(name) for name in future.result())
+        return iter(tuple(name for name in names if id(name) in found))
+
+    def find(self, query: str) -> tuple:
+        return self._merge(self._map("find", query))
+
+    def sorted_keys(self, first="", last="") -> tuple:
+        return tuple(sorted(self._merge(self._map("sorted_keys", first, last)),
+                            key=SortedNames.key))
+
+    def prefix_keys(self, prefix: str) -> tuple:
+        return tuple(sorted(self._merge(self._map("prefix_keys", prefix)),
+                            key=SortedNames.key))
+
+    def phone_keys(self, phone: str) -> tuple:
+        return self._merge(self._map("phone_keys", phone))
+
+    def complete_word(self, prefix: str, limit=None) -> list:
+        words = set()
+        for book_words in self._map("complete_word", prefix, limit).values():
+            words.update(book_words)
+        return sorted(words, key=SortedNames.key)[:limit]
+
+    def check_indexes(self) -> tuple:
+        return tuple(f"{tag}:{index}" for (tag, indexes)
+                     in self._map("check_indexes").items()
+                     for index in indexes)
+
+    def transaction(self):
+        return FederatedTransaction(self)
+
+    def refresh(self) -> tuple:
+        """Reloads records changed on disk in each book.
+        Returns (changed_names, conflict_names) as 'tag:name'"""
+        changed = ()
+        conflicts = ()
+        for (tag, shared) in self.shared.items():
+            result = shared.refresh(self.books[tag])
+            changed += tuple(f"{tag}:{name}" for name in result[0])
+            conflicts += tuple(f"{tag}:{name}" for name in result[1])
+        return (changed, conflicts)
+
+    def save(self) -> tuple:
+        """Writes changed books. Returns (changed_names, conflict_names)
+        of merge with changes of other users as 'tag:name'"""
+        changed = ()
+        conflicts = ()
+        for (tag, shared) in self.shared.items():
+            book = self.books[tag]
+            if not book.is_modified and not shared.is_changed_locally(book):
+                continue
+            result = shared.save(book)
+            changed += tuple(f"{tag}:{name}" for name in result[0])
+            conflicts += tuple(f"{tag}:{name}" for name in result[1])
+        self.is_modified = False
+        return (changed, conflicts)
+
+
+class FederatedTransaction:
+    """Transaction of each book of FederatedBook: all of them are
+    staged before the first one is committed"""
+
+    def __init__(self, federated):
+        self.federated = federated
+        self.transactions = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            for transaction in self.transactions.values():
+                transaction.commit()
+        return False
+
+    def _transaction(self, name):
+        tag = self.federated.tag_of(name)
+        if tag not in self.transactions:
+            self.transactions[tag] = Transaction(self.federated.books[tag])
+        return self.transactions[tag]
+
+    def add(self, name, fields):
+        self._transaction(name).add(name, fields)
+
+    def change(self, name, title: str, value: str, field_no=1):
+        self._transaction(name).change(name, title, value, field_no)
+
+    def delete(self, name, title="", value="", field_no=1):
+        self._transaction(name).delete(name, title, value, field_no)
+
+    def remove(self, name):
+        self._transaction(name).remove(name)
+
+    def rename(self, name, new_name: str):
+        self._transaction(name).rename(name, new_name)
+
+
+if __name__ == "__main__":
+    # Search of a few books at once and routing of changes back
+    import tempfile
+    import time
+
+    def letters(number: int) -> str:
+        word = ""
+        for __ in range(4):
+            (number, ix) = divmod(number, 32)
+            word += chr(ord("а") + ix)
+        return word.capitalize()
+
+    count = 20000
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for (book_no, tag) in enumerate(("home", "work", "club", "school")):
+            paths.append(Path(tmp) / f"{tag}.abo")
+            SharedBook(paths[-1]).save(AddressBook(tuple(
+                (f"{tag.capitalize()} {letters(ix)}",
+                 ("Phone", f"{book_no}11-{ix // 100:03d}-{ix % 100:02d}"))
+                for ix in range(count))))
+        start = time.perf_counter()
+        federated = FederatedBook.open(paths)
+        print(f"{len(paths)} books, {len(federated)} records are loaded in "
+              f"{time.perf_counter() - start:.2f} s")
+
+        start = time.perf_counter()
+        found = tuple(federated.iter_by_sample("*-05?-1*"))
+        print(f"search: {len(found)} record(s) in "
+              f"{time.perf_counter() - start:.2f} s")
+        print(federated.report(federated.phone_keys("311-000-0*")[:2]))
+
+        with federated.transaction() as tx:
+            for name in found:
+                tx.change(name, "Phone", "999-99-99")
+        federated.books["work"][Name("Work Аааа")].delete("Phone")
+        federated.save()
+        reloaded = FederatedBook.open(paths)
+        assert len(reloaded.phone_keys("999-99-99")) == len(found)
+        assert all(len(reloaded.books[federated.tag_of(name)][name]
+                       .fields) == 1 for name in found)
+        assert reloaded.books["work"][Name("Work Аааа")].fields == ()
+        assert reloaded.check_indexes() == ()
+        print("Changes are saved to books of records")
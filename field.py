@@ -32,6 +32,12 @@ class Field:
     def __str__(self):
         return self.value
 
+    def __copy__(self):
+        # Value is proven already: copy is made without setter
+        field = self.__class__.__new__(self.__class__)
+        field.__dict__.update(self.__dict__)
+        return field
+
     def __eq__(self, value):
         return self.value.lower() == str(value).lower()
 
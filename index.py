@@ -0,0 +1,60 @@
+"""Class Index
+
+Author: Dmytro Tarasiuk
+URL: https://github.com/RoyBebru/addressbook
+Email: RoyBebru@gmail.com
+License: MIT
+"""
+
+
+from abc import ABC, abstractmethod
+
+
+class Index(ABC):
+    """Secondary index of AddressBook. Registered index gets each
+    ChangeEvent by notify() and updates itself incrementally.
+    Subclass implements handlers, clear(), state(), dump() and load()
+    """
+
+    def notify(self, event):
+        event.dispatch(self)
+
+    @abstractmethod
+    def on_record_added(self, name, record):
+        pass
+
+    @abstractmethod
+    def on_record_removed(self, name, record):
+        pass
+
+    def on_record_renamed(self, old_name: str, name, record):
+        self.on_record_removed(old_name, record)
+        self.on_record_added(name, record)
+
+    @abstractmethod
+    def on_record_changed(self, record):
+        pass
+
+    @abstractmethod
+    def clear(self):
+        pass
+
+    def rebuild(self, ab):
+        """Builds index from scratch"""
+        self.clear()
+        for (name, record) in ab.data.items():
+            self.on_record_added(name, record)
+
+    @abstractmethod
+    def state(self):
+        """Comparable content to check consistency"""
+
+    @abstractmethod
+    def dump(self):
+        """Content of dicts, lists, sets, tuples, strings and numbers
+        only: records are referred by name"""
+
+    @abstractmethod
+    def load(self, state, lookup):
+        """Restores dump() content without rebuilding.
+        lookup: str(name) -> (name, record)"""
@@ -0,0 +1,88 @@
+"""Class IndexCache
+
+Author: Dmytro Tarasiuk
+URL: https://github.com/RoyBebru/addressbook
+Email: RoyBebru@gmail.com
+License: MIT
+"""
+
+
+import gc
+import marshal
+import os
+from pathlib import Path
+
+
+class IndexCache:
+    """Snapshot of address book indexes kept next to the book file.
+    Snapshot is tagged with content digest of the book file and is
+    used only while the book file has the same digest. The book can
+    be shared by several users, so anyone writing its directory could
+    change the snapshot: marshal is used instead of pickle. It restores
+    only dicts, lists, sets, tuples, strings and numbers of index
+    without Python loops and never calls code while loading.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        # Seconds spent to build indexes from scratch last time
+        self.build_seconds = None
+
+    def restore(self, ab, book_digest) -> bool:
+        """Registers default indexes of ab from snapshot.
+        Returns False if snapshot is absent or stale"""
+        # Cyclic GC would be run many times for a lot of new containers
+        gc.disable()
+        try:
+            return self._restore(ab, book_digest)
+        finally:
+            gc.enable()
+
+    def _restore(self, ab, book_digest) -> bool:
+        if book_digest is None:
+            return False
+        try:
+            with open(self.path, "rb") as fh:
+                cache = marshal.load(fh)
+        except (FileNotFoundError, PermissionError, EOFError, ValueError,
+                TypeError):
+            return False
+        if not isinstance(cache, dict) or cache.get("book") != book_digest:
+            return False
+        states = cache.get("indexes")
+        if not isinstance(states, dict) or any(
+                name not in states for name in ab.default_indexes.keys()):
+            return False
+        lookup = {str(name): (name, record)
+                  for (name, record) in ab.data.items()}
+        indexes = {}
+        try:
+            for (name, index_class) in ab.default_indexes.items():
+                indexes[name] = index_class()
+                indexes[name].load(states[name], lookup)
+        except (KeyError, IndexError, TypeError, ValueError,
+                AttributeError):
+            return False # snapshot does not fit the book
+        for (name, index) in indexes.items():
+            ab.register_index(name, index, rebuild=False)
+        self.build_seconds = cache.get("build_seconds")
+        if not isinstance(self.build_seconds, float):
+            self.build_seconds = None
+        return True
+
+    def save(self, ab, book_digest, build_seconds=None):
+        if book_digest is None:
+            return
+        if build_seconds is not None:
+            self.build_seconds = build_seconds
+        cache = {"book": book_digest,
+                 "build_seconds": self.build_seconds,
+                 "indexes": {name: ab.indexes[name].dump()
+                             for name in ab.default_indexes.keys()}}
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        try:
+            with open(tmp_path, "wb") as fh:
+                marshal.dump(cache, fh, marshal.version)
+            os.replace(tmp_path, self.path)
+        except PermissionError:
+            pass
@@ -0,0 +1,193 @@
+"""Class LinearPattern
+
+Author: Dmytro Tarasiuk
+URL: https://github.com/RoyBebru/addressbook
+Email: RoyBebru@gmail.com
+License: MIT
+
+Pattern is built by functions below instead of regex syntax:
+    LinearPattern(seq(opt(char("+")), rep(char(str.isdecimal), 1, 3)))
+is the same as re.compile(r"\\+?\\d{1,3}").
+"""
+
+
+class LinearMatch:
+    """The part of re.Match used by field validators"""
+
+    def __init__(self, start: int, end: int):
+        self._start = start
+        self._end = end
+
+    def start(self) -> int:
+        return self._start
+
+    def end(self) -> int:
+        return self._end
+
+    def span(self) -> tuple:
+        return (self._start, self._end)
+
+
+class LinearPattern:
+    """Backtracking matcher which tries alternatives in the same order
+    as re (leftmost-first, greedy), so it finds the same match. Failed
+    (instruction, position) states are remembered: without captures
+    and backreferences the state fails again from any start, so each
+    state is tried once and search costs O(len(program) * len(text)).
+    Short text is searched by the equal regex if it is given: its
+    backtracking is bounded by constant there and it is much faster
+    """
+    # Regex worst case on such text is about program worst case
+    short = 48
+
+    def __init__(self, program: list, regex=None):
+        self.program = program + [("match",)]
+        self.regex = regex
+
+    def search(self, text: str, pos=0):
+        """Returns match or None as re.Pattern.search() does"""
+        if self.regex is not None and len(text) - pos <= LinearPattern.short:
+            return self.regex.search(text, pos)
+        return self.scan(text, pos)
+
+    def scan(self, text: str, pos=0):
+        """Search by program only"""
+        program = self.program
+        width = len(text) + 1
+        failed = bytearray(len(program) * width)
+        for start in range(pos, width):
+            end = self._run(program, text, start, failed, width)
+            if end is not None:
+                return LinearMatch(start, end)
+        return None
+
+    @staticmethod
+    def _run(program, text, start, failed, width):
+        stack = [(0, start)]
+        while bool(stack):
+            (pc, pos) = stack.pop()
+            while not failed[pc * width + pos]:
+                failed[pc * width + pos] = 1
+                (op, *args) = program[pc]
+                if op == "char":
+                    if pos == len(text) or not args[0](text[pos]):
+                        break
+                    pc += 1
+                    pos += 1
+                elif op == "assert":
+                    if not args[0](text, pos):
+                        break
+                    pc += 1
+                elif op == "split":
+                    # The first branch is preferred, the second one waits
+                    stack.append((pc + args[1], pos))
+                    pc += args[0]
+                elif op == "jump":
+                    pc += args[0]
+                else:
+                    return pos
+        return None
+
+
+# Program pieces: jumps are relative, so pieces are simply concatenated
+
+def char(test) -> list:
+    """One character: test is predicate or string of characters"""
+    if isinstance(test, str):
+        return [("char", test.__contains__)]
+    return [("char", test)]
+
+
+def assertion(test) -> list:
+    """Zero width test(text, pos)"""
+    return [("assert", test)]
+
+
+def seq(*pieces) -> list:
+    return [instruction for piece in pieces for instruction in piece]
+
+
+def opt(piece) -> list:
+    """Greedy piece?"""
+    return [("split", 1, len(piece) + 1)] + piece
+
+
+def star(piece) -> list:
+    """Greedy piece*: piece must consume characters"""
+    return ([("split", 1, len(piece) + 2)] + piece
+            + [("jump", -len(piece) - 1)])
+
+
+def alt(first, second) -> list:
+    """first|second"""
+    return ([("split", 1, len(first) + 2)] + first
+            + [("jump", len(second) + 1)] + second)
+
+
+def rep(piece, least: int, most: int) -> list:
+    """Greedy piece{least,most}"""
+    tail = []
+    for __ in range(most - least):
+        tail = opt(piece + tail)
+    return piece * least + tail
+
+
+# Character classes of re for str patterns
+
+def is_word(ch: str) -> bool:
+    """\\w"""
+    return ch.isalnum() or ch == "_"
+
+
+def is_boundary(text: str, pos: int) -> bool:
+    """\\b"""
+    return ((pos > 0 and is_word(text[pos - 1]))
+            != (pos < len(text) and is_word(text[pos])))
+
+
+if __name__ == "__main__":
+    # Differential fuzz test against regexes and benchmark on
+    # adversarial strings
+    import random
+    import re
+    import time
+    from name import Name
+    from phone import Phone
+
+    validators = ((Name.pattern_name, Name.scanner_name),
+                  (Phone.pattern_phone_number, Phone.scanner_phone_number))
+    # Latin, cyrillic, unicode digits and spaces, pattern symbols
+    alphabet = "aZяЇ09_'-:+() \t\u0661\u00b2\u00a0\u2003"
+
+    rnd = random.Random(2023)
+    for (pattern, scanner) in validators:
+        for attempt in range(30000):
+            text = "".join(rnd.choice(alphabet)
+                           for __ in range(rnd.randint(0, 24)))
+            expected = pattern.search(text)
+            found = scanner.scan(text)
+            assert (None if expected is None else expected.span()) \
+                == (None if found is None else found.span()), repr(text)
+    print("Fuzz test: spans are the same for 60000 strings")
+
+    adversarial = {
+        "name": ("a" + "'" * 3000 + "_",
+                 "a" * 3000 + "1",
+                 "a-" * 1500 + "1",
+                 "Мар'ян " * 500 + "1"),
+        "phone": ("1" * 3000 + "x",
+                  "+1 (12) " * 400 + "x",
+                  "1-" * 1500 + "x",
+                  " " * 600 + "x"), # regex is cubic here
+    }
+    for ((pattern, scanner), (title, texts)) in zip(validators,
+                                                    adversarial.items()):
+        for text in texts:
+            start = time.perf_counter()
+            pattern.search(text)
+            middle = time.perf_counter()
+            scanner.search(text)
+            stop = time.perf_counter()
+            print(f"{title} {text[:12]!r}... of {len(text)}: "
+                  f"re {(middle - start) * 1000:.1f} ms, "
+                  f"linear {(stop - middle) * 1000:.1f} ms")
@@ -10,16 +10,32 @@ License: MIT
 
 from addressbook import AddressBook, AddressBookException
 from birthday import BirthdayException
+from bookfile import BookFile, BookFileException
+from bookhistory import BookHistory, HistoryException
+import booksync
+from booksync import SyncException
+from export import export, ExportException, FORMATS
+from federatedbook import FederatedBook
+from indexcache import IndexCache
+from memstats import MemStats, MemStatsException
 from name import Name, NameException
 from phone import Phone, PhoneException
+from query import Query, QueryException
 from record import Record, RecordException
+from shardedaddressbook import ShardedAddressBook
+from sharedbook import SharedBook
+from shardstore import ShardStore, ShardStoreException
+from transaction import TransactionException
+from trie import Trie
 
 import atexit
-import json
 import os
 from pathlib import Path
 import re
 import sys
+import tempfile
+import time
+import tracemalloc
 
 
 """CONSTANTS"""
@@ -27,7 +43,20 @@ path = Path(sys.argv[0])
 SCRIPT_NAME = path.name
 SCRIPT_DIR = path.parent.resolve()
 ADDRESSBOOK_PATHFILE = SCRIPT_DIR / (path.stem + ".abo")
+# Compressed book (main.abo.gz, main.abo.xz, main.abo.zst) is used if present
+# and its codec is installed
+for suffix in BookFile.codecs.keys():
+    if BookFile.is_supported(suffix) \
+            and Path(str(ADDRESSBOOK_PATHFILE) + suffix).is_file():
+        ADDRESSBOOK_PATHFILE = Path(str(ADDRESSBOOK_PATHFILE) + suffix)
+        break
+# If directory is present, sharded address book is used instead of file
+ADDRESSBOOK_SHARDDIR = SCRIPT_DIR / (path.stem + ".abs")
+ADDRESSBOOK_INDEXFILE = SCRIPT_DIR / (path.stem + ".abi")
+ADDRESSBOOK_HISTORYDIR = SCRIPT_DIR / (path.stem + ".abh")
 HISTFILE = SCRIPT_DIR / (path.stem + ".history")
+# Number of completions shown by Tab
+COMPLETION_LIMIT = 100
 
 
 def command_error_catcher(cmd_hundler):
@@ -44,6 +73,20 @@ def command_error_catcher(cmd_hundler):
             return f"Phone Error: {e.args[0]}"
         except BirthdayException as e:
             return f"Birthday Error: {e.args[0]}"
+        except ExportException as e:
+            return f"Export Error: {e.args[0]}"
+        except QueryException as e:
+            return f"Query Error: {e.args[0]}"
+        except SyncException as e:
+            return f"Sync Error: {e.args[0]}"
+        except HistoryException as e:
+            return f"History Error: {e.args[0]}"
+        except TransactionException as e:
+            return f"Transaction Error: {e.args[0]}"
+        except BookFileException as e:
+            return f"Book File Error: {e.args[0]}"
+        except MemStatsException as e:
+            return f"MemStats Error: {e.args[0]}"
     return decor
 
 
@@ -61,6 +104,12 @@ def cmd_help(*__):
         + "> show 111-22-33"
         + os.linesep + "Matches records with the relevant person name: "
         + "> show Кас'ян Дем'янович Непийпиво-В'юнець"
+        + os.linesep + "Matches records with names in alphabet range: "
+        + "> show А..Г"
+        + os.linesep + "Matches records with names starting with prefix: "
+        + "> show prefix:Кас"
+        + os.linesep + "Matches records with phone starting with digits: "
+        + "> show phone:+38067*"
         + os.linesep + "Show matching records: > show"
         + os.linesep + "Search in matching records by template with "
         + "metasymbols '*'/'?': > search #2"
@@ -76,6 +125,37 @@ def cmd_help(*__):
         + "> add Голілиць Рада Варфоломіївна"
         + os.linesep + "Add new field to the last searched record: "
         + "> add phone +48 551-051-555"
+        + os.linesep + "Matches records by words in address or comment "
+        + "field: > find address:Остробрамська кв*"
+        + os.linesep + "Matches records by query with field predicates: "
+        + "> query phone:067* AND NOT birthday:>01.01.1990"
+        + os.linesep + "Show how query is evaluated: "
+        + "> explain name:Бебру OR address:Героїв"
+        + os.linesep + "Check indexes by rebuilding them: > check"
+        + os.linesep + "Show startup time metrics: > metrics"
+        + os.linesep + "Show memory by parts of records, field types and "
+        + "indexes: > memstats"
+        + os.linesep + "Measure peak memory of book load or dump: "
+        + "> memstats load; > memstats dump"
+        + os.linesep + "Write memory difference between two points to file: "
+        + "> memstats mark; ...; > memstats diff <file>"
+        + os.linesep + "Export address book or MATCH-SET to csv, vcard "
+        + "or ndjson: > export [match] [<format>] <file>"
+        + os.linesep + "Merge with other address book file both ways: "
+        + "> sync <file>"
+        + os.linesep + "Offline sync: > sync summary <summary_file>; on other "
+        + "machine > sync delta <summary_file> <delta_file>;"
+        + os.linesep + "and back > sync apply <delta_file>"
+        + os.linesep + "List saved versions of address book: > versions"
+        + os.linesep + "Show changes since version 3 or between versions: "
+        + "> diff 3 [5]"
+        + os.linesep + "Restore records of version 3 (saved on exit): "
+        + "> restore 3"
+        + os.linesep + "Tab completes command and words of names: "
+        + "> show Кас<Tab>"
+        + os.linesep + "Run with book files to work with all of them at once: "
+        + os.linesep + f"$ {SCRIPT_NAME} home.abo work.abo; records are "
+        + "tagged with book, new record goes to the first one"
     )
 
 
@@ -98,7 +178,7 @@ def cmd_add(cmd_args: str, box):
         # Create new record
         value = ' '.join(args)
         name = Name(value)
-        if isinstance(box.ab[name], Record):
+        if name in box.ab:
             return f"Error: name '{' '.join(args)}' already exists" 
         box.ab[name] = ()
         box.ab_fit += (name,)
@@ -138,8 +218,9 @@ def cmd_change(cmd_args: str, box):
             # Field title is present: change field value 
             args.pop(0)
             value = " ".join(args)
-            for name in box.ab_fit_to_fit:
-                box.ab[name].change(title, value, field_no)
+            with box.ab.transaction() as tx:
+                for name in box.ab_fit_to_fit:
+                    tx.change(name, title, value, field_no)
             break # field is found and changed
     else:
         if title != "Name":
@@ -147,8 +228,9 @@ def cmd_change(cmd_args: str, box):
         args.pop(0)
         value = " ".join(args)
         if bool(value):
-            for name in box.ab_fit_to_fit:
-                box.ab[name] = value
+            with box.ab.transaction() as tx:
+                for name in box.ab_fit_to_fit:
+                    tx.rename(name, value)
         else:
             return "Change error: Name field parameter is required"
     box.ab.is_modified = True
@@ -179,8 +261,9 @@ def cmd_delete(cmd_args: str, box):
             # Field title is present: delete this field within record(s)
             args.pop(0)
             value = " ".join(args)
-            for name in box.ab_fit_to_fit:
-                box.ab[name].delete(title, value, field_no)
+            with box.ab.transaction() as tx:
+                for name in box.ab_fit_to_fit:
+                    tx.delete(name, title, value, field_no)
             break # field is found and deleted
     else:
         if title == "Name" or not bool(title):
@@ -190,22 +273,189 @@ def cmd_delete(cmd_args: str, box):
             # Delete all record(s) in ab_fit
             box.ab_fit = tuple(name for name in box.ab_fit
                             if name not in box.ab_fit_to_fit)
-            for name in box.ab_fit_to_fit:
-                box.ab.pop(name)
+            with box.ab.transaction() as tx:
+                for name in box.ab_fit_to_fit:
+                    tx.remove(name)
         else:
             value = " ".join(args)
             # Delete record(s) with Name == value
             box.ab_fit = tuple(name for name in box.ab_fit
                             if name not in box.ab_fit_to_fit \
                                 or not name.is_substr(value))
-            for name in box.ab_fit_to_fit:
-                if name.is_substr(value):
-                    box.ab.pop(name)
+            with box.ab.transaction() as tx:
+                for name in box.ab_fit_to_fit:
+                    if name.is_substr(value):
+                        tx.remove(name)
         box.ab_fit_to_fit = box.ab_fit
     box.ab.is_modified = True
     return
 
 
+@command_error_catcher
+def cmd_export(cmd_args: str, box):
+    args = cmd_args.split(' ') # [''] == ''.split(' ')
+    names = None # whole address book
+    if args[0].lower() == "match":
+        args.pop(0)
+        names = box.ab_fit
+    fmt = None # format is taken from file suffix
+    if len(args) > 1 and args[0].lower() in FORMATS:
+        fmt = args.pop(0)
+    pathfile = " ".join(args)
+    if not bool(pathfile):
+        return "Export error: file name is required"
+    count = export(box.ab, pathfile, fmt, names)
+    return f"Exported {count} record(s) to '{pathfile}'"
+
+
+def report_delta(result, comparisons=None) -> str:
+    (added, merged, conflicts) = result
+    report = f"Added {len(added)}, merged {len(merged)} record(s)"
+    if comparisons is not None:
+        report += f" ({comparisons} comparison(s))"
+    for (name, title, value) in conflicts:
+        report += (os.linesep + f"Conflict: '{name}' keeps its {title}, "
+                   f"other {title} is '{value}'")
+    return report
+
+
+@command_error_catcher
+def cmd_sync(cmd_args: str, box):
+    (subcmd, __, rest) = cmd_args.partition(' ')
+    subcmd = subcmd.lower()
+    if subcmd == "summary" and bool(rest):
+        tree = booksync.MerkleTree.from_book(box.ab)
+        booksync.write_json(rest, tree.as_dict())
+        return f"Summary of {len(box.ab)} record(s) is written to '{rest}'"
+    if subcmd == "delta" and len(rest.split(' ')) == 2:
+        (summary_file, delta_file) = rest.split(' ')
+        (delta, comparisons) = booksync.delta_for(
+            box.ab, booksync.read_json(summary_file))
+        booksync.write_json(delta_file, delta)
+        return (f"Delta of {len(delta)} record(s) is written to "
+                f"'{delta_file}' ({comparisons} comparison(s))")
+    if subcmd == "apply" and bool(rest):
+        delta = booksync.read_json(rest)
+        if not isinstance(delta, dict):
+            raise SyncException(f"wrong format of '{rest}'")
+        return report_delta(booksync.apply_delta(box.ab, delta))
+    if not bool(cmd_args):
+        return "Sync error: file name is required"
+    if not Path(cmd_args).is_file():
+        raise SyncException(f"file '{cmd_args}' is not found")
+    other = SharedBook(cmd_args)
+    other_ab = AddressBook(other.load(), build_indexes=False)
+    (result, __, comparisons) = booksync.sync_books(box.ab, other_ab)
+    if other_ab.is_modified:
+        other.save(other_ab)
+    return report_delta(result, comparisons)
+
+
+def version_number(arg: str) -> int:
+    if not arg.lstrip('#').isdigit():
+        raise HistoryException(f"version number is expected instead '{arg}'")
+    return int(arg.lstrip('#'))
+
+
+def report_record_list(name, rec_list, sign) -> str:
+    return os.linesep.join([f"{sign} {name}"] + [
+        f"{sign}   {title}: {value}" for (title, value) in rec_list])
+
+
+@command_error_catcher
+def cmd_versions(cmd_args: str, box):
+    return box.history.report() or "No saved version"
+
+
+@command_error_catcher
+def cmd_diff(cmd_args: str, box):
+    args = cmd_args.split(' ')
+    if not bool(cmd_args) or len(args) > 2:
+        return "Diff error: one or two version numbers are required"
+    if len(args) == 1:
+        changes = box.history.diff(version_number(args[0]), box.ab)
+    else:
+        changes = box.history.diff(version_number(args[0]),
+                                   version_number(args[1]))
+    report = []
+    for (name, (old, new)) in changes.items():
+        if old is None:
+            report.append(report_record_list(name, new, "+"))
+        elif new is None:
+            report.append(report_record_list(name, old, "-"))
+        else:
+            report.append(os.linesep.join(
+                [f"~ {name}"]
+                + [f"-   {title}: {value}" for [title, value] in old
+                   if [title, value] not in new]
+                + [f"+   {title}: {value}" for [title, value] in new
+                   if [title, value] not in old]))
+    return os.linesep.join(report) or "No changes"
+
+
+@command_error_catcher
+def cmd_restore(cmd_args: str, box):
+    count = box.history.restore(box.ab, version_number(cmd_args))
+    box.ab_fit = box.ab.keys()
+    box.ab_fit_to_fit = box.ab_fit
+    return f"Restored {count} record(s) of version {cmd_args.lstrip('#')}"
+
+
+@command_error_catcher
+def cmd_check(cmd_args: str, box):
+    inconsistent = box.ab.check_indexes()
+    if bool(inconsistent):
+        return "Inconsistent index(es): " + ", ".join(inconsistent)
+    return f"All {len(box.ab.indexes)} index(es) are consistent"
+
+
+def cmd_metrics(cmd_args: str, box):
+    return os.linesep.join(f"{stage}: {seconds * 1000:.1f} ms"
+                           for (stage, seconds) in box.metrics.items())
+
+
+def load_for_memstats(path):
+    # The same stages as on startup: file, records, indexes
+    return AddressBook(SharedBook(path).load())
+
+
+def dump_for_memstats(ab, path):
+    # The same codec as book file has, but into temporary file
+    with tempfile.TemporaryDirectory() as tmp:
+        BookFile(Path(tmp) / Path(path).name).write(ab.JSON_helper())
+
+
+@command_error_catcher
+def cmd_memstats(cmd_args: str, box):
+    args = cmd_args.split(' ')
+    if args[0] in ("load", "dump"):
+        if not hasattr(box, "shared"):
+            raise MemStatsException("address book is not kept in one file")
+        if args[0] == "load":
+            box.memstats.trace("load", load_for_memstats, box.shared.path)
+        else:
+            box.memstats.trace("dump", dump_for_memstats, box.ab,
+                               box.shared.path)
+        return (f"Peak of {args[0]}: "
+                f"{box.memstats.peaks[args[0]] / 2**20:.1f} MiB")
+    if args[0] == "mark":
+        box.memstats.mark()
+        return "Allocations are traced from here: use 'memstats diff <file>'"
+    if args[0] == "diff" and len(args) == 2:
+        (count, size) = box.memstats.diff(args[1])
+        return (f"{count} line(s) of difference {size / 2**20:+.1f} MiB "
+                f"are written to '{args[1]}'")
+    if bool(cmd_args):
+        return "Unknown memstats argument: use help for more information"
+    if isinstance(box.ab, ShardedAddressBook) \
+            and box.ab.loaded_shards < box.ab.store.shards:
+        # Shards are loaded on demand: the rest is not in memory yet
+        return (f"Only {box.ab.loaded_shards} of {box.ab.store.shards} "
+                "shard(s) are loaded and counted: use 'all' to load all"
+                + os.linesep + box.memstats.report(box.ab))
+    return box.memstats.report(box.ab)
+
+
 @command_error_catcher
 def cmd_exit(*args):
     # dump_addressbook(args[1])
@@ -228,18 +478,57 @@ def cmd_search(cmd_args: str, box):
     return report_fit_to_fit(box)
 
 
+@command_error_catcher
+def cmd_find(cmd_args: str, box):
+    box.ab_fit = box.ab.find(cmd_args)
+    box.ab_fit_to_fit = box.ab_fit
+    return box.ab.report(box.ab_fit)
+
+
+@command_error_catcher
+def cmd_query(cmd_args: str, box):
+    box.ab_fit = Query(cmd_args).run(box.ab)
+    box.ab_fit_to_fit = box.ab_fit
+    return box.ab.report(box.ab_fit)
+
+
+@command_error_catcher
+def cmd_explain(cmd_args: str, box):
+    return Query(cmd_args).explain(box.ab)
+
+
 @command_error_catcher
 def cmd_show(cmd_args: str, box):
     if not bool(cmd_args):
         return report_fit_to_fit(box) 
+    if cmd_args[:len("prefix:")].lower() == "prefix:":
+        # Names starting with prefix in alphabet order
+        box.ab_fit = box.ab.prefix_keys(cmd_args[len("prefix:"):].strip())
+        box.ab_fit_to_fit = box.ab_fit
+        return box.ab.report(box.ab_fit)
+    if cmd_args[:len("phone:")].lower() == "phone:":
+        # Phone equal or starting with digits before '*'
+        box.ab_fit = box.ab.phone_keys(cmd_args[len("phone:"):].strip())
+        box.ab_fit_to_fit = box.ab_fit
+        return box.ab.report(box.ab_fit)
+    if ".." in cmd_args:
+        # Names in alphabet order from first up to last letter(s)
+        (first, __, last) = cmd_args.partition("..")
+        box.ab_fit = box.ab.sorted_keys(first.strip(), last.strip())
+        box.ab_fit_to_fit = box.ab_fit
+        return box.ab.report(box.ab_fit)
     try:
         box.ab_fit = ()
         ph = Phone(cmd_args)
-        for name in box.ab.keys():
-            for field in box.ab[name].fields:
-                if isinstance(field, Phone) and field == ph:
-                    box.ab_fit += (name,)
-                    break
+        if isinstance(box.ab, FederatedBook):
+            # Phone index of each book is searched in parallel
+            box.ab_fit = box.ab.phone_keys(str(ph))
+        else:
+            for name in box.ab.keys():
+                for field in box.ab[name].fields:
+                    if isinstance(field, Phone) and field == ph:
+                        box.ab_fit += (name,)
+                        break
     except PhoneException:
         box.ab_fit = box.ab[cmd_args]
     box.ab_fit_to_fit = box.ab_fit
@@ -272,20 +561,53 @@ HANDLERS = {
     cmd_change: re.compile(r"^(?:c|ch|cha|chan|chang|change|"
                            r"з|зм|змі|змін|зміна|зміни|змінит|змінити)$",
                            re.IGNORECASE),
+    cmd_check: re.compile(r"^(?:chec|check|"
+                          r"перев|перевір|перевірка)$",
+                          re.IGNORECASE),
     cmd_delete: re.compile(r"^(?:d|de|del|dele|delet|delete|"
                            r"вид|вида|видал|видали|видалит|видалити)$",
                            re.IGNORECASE),
+    cmd_export: re.compile(r"^(?:exp|expo|expor|export|"
+                           r"експ|експо|експор|експорт)$",
+                           re.IGNORECASE),
+    cmd_diff: re.compile(r"^(?:di|dif|diff|"
+                         r"різн|різниц|різниця)$",
+                         re.IGNORECASE),
     cmd_exit: re.compile(r"^(?:\.|e|ex|exi|exit|"
                          r"q|qu|qui|quit|"
                          r"b|by|bye|"
                          r"вий|вий[тд]|вий[дт]и|вих|вихі|вихід)$",
                          re.IGNORECASE),
+    cmd_explain: re.compile(r"^(?:expl|expla|explai|explain|"
+                            r"план|поясн|поясни)$",
+                            re.IGNORECASE),
+    cmd_find: re.compile(r"^(?:f|fi|fin|find|"
+                         r"зн|зна|знай|знайд|знайди)$",
+                         re.IGNORECASE),
     cmd_help: re.compile(r"^(?:\?|h|he|hel|help|"
                          r"доп|допо|допом|допомо|допомож|допоможи|допомог|допомога)$",
                          re.IGNORECASE),
+    cmd_memstats: re.compile(r"^(?:mem|mems|memst|memsta|memstat|memstats|"
+                             r"пам|пам'я|пам'ят|пам'ять)$",
+                             re.IGNORECASE),
+    cmd_metrics: re.compile(r"^(?:met|metr|metri|metric|metrics|"
+                            r"метр|метри|метрик|метрики)$",
+                            re.IGNORECASE),
+    cmd_query: re.compile(r"^(?:que|quer|query|"
+                          r"запи|запит)$",
+                          re.IGNORECASE),
+    cmd_restore: re.compile(r"^(?:rest|resto|restor|restore|"
+                            r"відн|відно|віднов|відновит|відновити)$",
+                            re.IGNORECASE),
     cmd_search: re.compile(r"^(?:se|se[ea]|sear|searc|search|"
                            r"ш|шу|шук|шука|шукай|шукат|шукати)$",
                            re.IGNORECASE), 
+    cmd_sync: re.compile(r"^(?:sy|syn|sync|"
+                         r"син|синх|синхр|синхрон|синхронізуй)$",
+                         re.IGNORECASE),
+    cmd_versions: re.compile(r"^(?:ver|vers|versi|versio|version|versions|"
+                             r"верс|версі|версії)$",
+                             re.IGNORECASE),
     cmd_show: re.compile(r"^(?:sh|sho|show|"
                          r"п|по|пок|пока|пока[зж]|покажи|показа|показат|показати|"
                          r"ди|див|диви|дивис|дивися|дивит|дивити|дивитис|дивитис[яь])$",
@@ -293,6 +615,14 @@ HANDLERS = {
 }
 
 
+# Commands which are not supported for a few books at once
+SINGLE_BOOK_HANDLERS = (cmd_diff, cmd_explain, cmd_export, cmd_memstats,
+                        cmd_query, cmd_restore, cmd_sync, cmd_versions)
+
+# Versions are not kept for shards: every shard would be read to save
+HISTORY_HANDLERS = (cmd_diff, cmd_restore, cmd_versions)
+
+
 def get_handler(cmd: str):
     for (func, regex) in HANDLERS.items():
         if regex.search(cmd):
@@ -300,34 +630,118 @@ def get_handler(cmd: str):
     return cmd_unknown
 
 
+def command_aliases(regex) -> tuple:
+    """Words matched by alias regex of HANDLERS: alternatives of
+    characters, [...] classes and escaped characters"""
+    aliases = ()
+    for alternative in regex.pattern[len("^(?:"):-len(")$")].split("|"):
+        words = ("",)
+        for part in re.findall(r"\[[^]]*\]|\\.|.", alternative):
+            chars = part[1:-1] if part.startswith("[") else part[-1]
+            words = tuple(word + char for word in words for char in chars)
+        aliases += words
+    return aliases
+
+
+def command_trie() -> Trie:
+    """The longest aliases of each command: short forms are their
+    prefixes and would only multiply completions"""
+    trie = Trie()
+    for regex in HANDLERS.values():
+        aliases = command_aliases(regex)
+        for alias in aliases:
+            if not any(other != alias and other.startswith(alias)
+                       for other in aliases):
+                trie.add(alias)
+    return trie
+
+
+def report_sync(changed, conflicts):
+    report = ""
+    if len(changed) > len(conflicts):
+        report += (f"Reloaded {len(changed) - len(conflicts)} record(s) "
+                   "changed by other user(s)")
+    if bool(conflicts):
+        if bool(report):
+            report += os.linesep
+        report += ("Conflicting edits are merged: " + ", ".join(conflicts))
+    return report
+
+
+def refresh_addressbook(box):
+    """Reloads records changed on disk by other processes"""
+    if isinstance(box.ab, ShardedAddressBook):
+        return ""
+    if isinstance(box.ab, FederatedBook):
+        (changed, conflicts) = box.ab.refresh()
+    else:
+        (changed, conflicts) = box.shared.refresh(box.ab)
+    if bool(changed):
+        # Deleted by other user records are removed from MATCH-SET
+        box.ab_fit = tuple(name for name in box.ab_fit if name in box.ab)
+        box.ab_fit_to_fit = tuple(name for name in box.ab_fit_to_fit
+                                  if name in box.ab)
+    return report_sync(changed, conflicts)
+
+
+def commit_history(box, book_digest=None):
+    """Saved address book becomes version"""
+    try:
+        # Records are compared as SharedBook keeps them after save
+        box.history.commit(box.ab, book_digest, box.shared.base)
+    except OSError:
+        pass # history is not writable: book is saved anyway
+
+
 def dump_addressbook(box):
     if not box.ab.is_modified:
         return
+    if isinstance(box.ab, ShardedAddressBook):
+        # Version would read every shard: only changed shards are saved
+        try:
+            box.ab.save()
+        except PermissionError:
+            pass
+        return
+    if isinstance(box.ab, FederatedBook):
+        try:
+            report = report_sync(*box.ab.save())
+        except PermissionError:
+            return
+        if bool(report):
+            print(report)
+        return
     try:
-        with open(ADDRESSBOOK_PATHFILE, "w") as fh:
-            fh.write(json.dumps(box.ab.JSON_helper(), 
-                                indent=2,
-                                ensure_ascii=False))
+        (changed, conflicts) = box.shared.save(box.ab)
     except PermissionError:
         return
-    box.ab.is_modified = False
+    box.index_cache.save(box.ab, box.shared.digest)
+    commit_history(box, box.shared.digest)
+    report = report_sync(changed, conflicts)
+    if bool(report):
+        print(report)
     return
 
 
-def load_addressbook():
-    try:
-        with open(ADDRESSBOOK_PATHFILE, "r") as fh:
-            ab = json.loads(fh.read())
-    except FileNotFoundError:
-        return ()
-    except PermissionError:
-        return ()
-    
-    ab_as_tuple = ()
-    for (name, record_list_of_list) in ab.items():
-        ab_as_tuple += ( ((name,) + tuple((pair[0], pair[1])
-                        for pair in record_list_of_list)), )
-    return ab_as_tuple
+def load_addressbook(box):
+    box.shared = SharedBook(ADDRESSBOOK_PATHFILE)
+    return box.shared.load()
+
+
+def load_indexes(box):
+    """Restores indexes from snapshot or builds them"""
+    box.index_cache = IndexCache(ADDRESSBOOK_INDEXFILE)
+    start = time.perf_counter()
+    if box.index_cache.restore(box.ab, box.shared.digest):
+        box.metrics["index load"] = time.perf_counter() - start
+        if box.index_cache.build_seconds is not None:
+            box.metrics["index load saved"] = (box.index_cache.build_seconds
+                                         - box.metrics["index load"])
+        return
+    box.ab.create_indexes()
+    box.metrics["index build"] = time.perf_counter() - start
+    box.index_cache.save(box.ab, box.shared.digest,
+                         box.metrics["index build"])
 
 
 def input_or_default(prompt="", default=""):
@@ -337,12 +751,51 @@ def input_or_default(prompt="", default=""):
         return default
 
 
+def open_addressbook(box):
+    """Loads book files given in command line, shards or book file"""
+    start = time.perf_counter()
+    if len(sys.argv) > 1:
+        # Book files are given: they are searched and changed together
+        box.ab = FederatedBook.open(sys.argv[1:])
+        box.metrics["book load"] = time.perf_counter() - start
+        box.ab_fit = box.ab.keys()
+    else:
+        try:
+            # Shards are loaded on demand: MATCH-SET is empty until 'all'
+            box.ab = ShardedAddressBook(ShardStore(ADDRESSBOOK_SHARDDIR))
+            box.ab_fit = ()
+            box.metrics["book load"] = time.perf_counter() - start
+        except ShardStoreException:
+            if tracemalloc.is_tracing():
+                # PYTHONTRACEMALLOC=1: peak of startup load is kept too
+                box.ab = box.memstats.trace(
+                    "startup load", lambda: AddressBook(
+                        load_addressbook(box), build_indexes=False))
+            else:
+                box.ab = AddressBook(load_addressbook(box),
+                                     build_indexes=False)
+            box.metrics["book load"] = time.perf_counter() - start
+            load_indexes(box)
+            # Book could be changed without this program: keep it as version
+            commit_history(box, box.shared.digest)
+            box.ab_fit = box.ab.keys()
+
+
 def main() -> None:
     # Function is used as convenient container for associated objects
     def box(): pass
-    box.ab = AddressBook(load_addressbook())
-    box.ab_fit = box.ab.keys()
+    # Startup time in seconds by stage
+    box.metrics = {}
+    box.history = BookHistory(ADDRESSBOOK_HISTORYDIR)
+    box.memstats = MemStats()
+    try:
+        open_addressbook(box)
+    except BookFileException as e:
+        # Damaged book or codec without its package
+        print(f"Book File Error: {e.args[0]}")
+        return
     box.ab_fit_to_fit = box.ab_fit
+    turn_on_edit_in_input(box)
     print("Use ? for more information")
 
     while True:
@@ -366,9 +819,21 @@ def main() -> None:
             else:
                 break
 
+        report = refresh_addressbook(box)
+        if bool(report):
+            print(report)
+
         (cmd, cmd_args) = parse(normalize(cmd_raw))
 
         handler = get_handler(cmd)
+        if isinstance(box.ab, FederatedBook) \
+                and handler in SINGLE_BOOK_HANDLERS:
+            print("Command works with one address book only")
+            continue
+        if isinstance(box.ab, ShardedAddressBook) \
+                and handler in HISTORY_HANDLERS:
+            print("Versions are not kept for sharded address book")
+            continue
 
         result_text = handler(cmd_args, box)
         if bool(result_text):
@@ -378,7 +843,26 @@ def main() -> None:
             break
 
 
-def turn_on_edit_in_input():
+def make_completer(box, readline):
+    """Completes command in the start of line and name word after it.
+    Word after 'prefix:' and alike is completed as name word too"""
+    commands = command_trie()
+    matches = []
+
+    def complete(text, state):
+        if state == 0:
+            (head, colon, word) = text.rpartition(":")
+            line = readline.get_line_buffer()
+            if not bool(line[:readline.get_begidx()].strip()):
+                words = commands.complete(word, COMPLETION_LIMIT)
+            else:
+                words = box.ab.complete_word(word, COMPLETION_LIMIT)
+            matches[:] = [head + colon + word for word in words]
+        return matches[state] if state < len(matches) else None
+    return complete
+
+
+def turn_on_edit_in_input(box):
     try:
         import readline
         try:
@@ -388,10 +872,16 @@ def turn_on_edit_in_input():
         # Default history len is -1 (infinite), which may grow unruly
         readline.set_history_length(1000)
         atexit.register(readline.write_history_file, HISTFILE)
+        # Apostrophe and hyphen are parts of name
+        readline.set_completer_delims(" \t\n")
+        readline.set_completer(make_completer(box, readline))
+        if "libedit" in (readline.__doc__ or ""):
+            readline.parse_and_bind("bind ^I rl_complete") # macOS
+        else:
+            readline.parse_and_bind("tab: complete")
     except ModuleNotFoundError:
         pass
 
 
 if __name__ == "__main__":
-    turn_on_edit_in_input()
     main()
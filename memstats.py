@@ -0,0 +1,194 @@
+"""Class MemStats
+
+Author: Dmytro Tarasiuk
+URL: https://github.com/RoyBebru/addressbook
+Email: RoyBebru@gmail.com
+License: MIT
+"""
+
+
+import os
+import sys
+import tracemalloc
+import types
+
+
+class MemStatsException(Exception):
+    def __init__(self, *args, **kwargs):
+        # Call parent constructor
+        super(Exception, self).__init__(*args, **kwargs)
+
+
+class MemStats:
+    """Memory of address book. Objects are measured by sys.getsizeof()
+    traversal: each object is counted once, so memory of index does not
+    include names and records which are counted in the book. Peaks of
+    stages and difference between two points of session are got by
+    tracemalloc.
+    """
+    # Code, classes and modules are shared: they are not traversed
+    shared_types = (type, types.ModuleType, types.FunctionType,
+                    types.BuiltinFunctionType, types.MethodType,
+                    types.CodeType)
+
+    def __init__(self):
+        # Stage -> peak bytes
+        self.peaks = {}
+        self.snapshot = None
+        # tracemalloc is started by mark() and stopped by diff()
+        self.is_tracing_started = False
+
+    @staticmethod
+    def deep_size(obj, seen=None) -> int:
+        """Bytes of obj and of objects reachable from it which are not
+        in seen: ids of counted objects"""
+        if seen is None:
+            seen = set()
+        size = 0
+        stack = [obj]
+        while len(stack) > 0:
+            obj = stack.pop()
+            if id(obj) in seen or obj is None \
+                    or isinstance(obj, MemStats.shared_types):
+                continue
+            seen.add(id(obj))
+            size += sys.getsizeof(obj)
+            if isinstance(obj, dict):
+                stack.extend(obj.keys())
+                stack.extend(obj.values())
+            elif isinstance(obj, (list, tuple, set, frozenset)):
+                stack.extend(obj)
+            if hasattr(obj, "__dict__"):
+                stack.append(obj.__dict__)
+            for slot in getattr(type(obj), "__slots__", ()):
+                if hasattr(obj, slot):
+                    stack.append(getattr(obj, slot))
+        return size
+
+    @staticmethod
+    def _count(parts: dict, part: str, obj, seen) -> int:
+        if id(obj) in seen:
+            return 0
+        seen.add(id(obj))
+        size = sys.getsizeof(obj)
+        parts[part] = parts.get(part, 0) + size
+        return size
+
+    def book(self, ab) -> tuple:
+        """Returns (parts, field_types, indexes):
+            parts: part of records -> bytes
+            field_types: title -> (count, bytes)
+            indexes: name -> bytes without records"""
+        seen = set()
+        parts = {}
+        field_types = {}
+        MemStats._count(parts, "book dict", ab.data, seen)
+        for (name, record) in ab.data.items():
+            MemStats._count(parts, "Name objects", name, seen)
+            MemStats._count(parts, "__dict__s", name.__dict__, seen)
+            MemStats._count(parts, "strings", name.value, seen)
+            MemStats._count(parts, "Record objects", record, seen)
+            MemStats._count(parts, "__dict__s", record.__dict__, seen)
+            MemStats._count(parts, "field tuples", record.fields, seen)
+            MemStats._count(parts, "observer lists", record.observers, seen)
+            for observer in record.observers:
+                MemStats._count(parts, "observer lists", observer, seen)
+            for field in record.fields:
+                size = (MemStats._count(parts, "Field objects", field, seen)
+                        + MemStats._count(parts, "__dict__s",
+                                          field.__dict__, seen)
+                        + MemStats._count(parts, "strings", field.value,
+                                          seen))
+                (count, total) = field_types.get(field.title, (0, 0))
+                field_types[field.title] = (count + 1, total + size)
+        indexes = {name: MemStats.deep_size(index, seen)
+                   for (name, index) in ab.indexes.items()}
+        return (parts, field_types, indexes)
+
+    def report(self, ab) -> str:
+        (parts, field_types, indexes) = self.book(ab)
+        total = sum(parts.values())
+        count = max(len(ab.data), 1)
+        lines = [f"Records: {len(ab.data)}, {total} bytes, "
+                 f"{total // count} bytes per record"]
+        lines += [f"  {part:15s}{size:12d} bytes {size / count:8.0f} "
+                  "per record"
+                  for (part, size) in sorted(parts.items(),
+                                             key=lambda it: -it[1])]
+        lines.append("Fields by type:")
+        lines += [f"  {title:15s}{count:8d} x {size // count:5d} bytes = "
+                  f"{size} bytes"
+                  for (title, (count, size)) in field_types.items()]
+        lines.append(f"Indexes: {sum(indexes.values())} bytes")
+        lines += [f"  {name:15s}{size:12d} bytes {size / count:8.0f} "
+                  "per record"
+                  for (name, size) in indexes.items()]
+        if bool(self.peaks):
+            lines.append("Peaks:")
+            lines += [f"  {stage:15s}{size:12d} bytes"
+                      for (stage, size) in self.peaks.items()]
+        return os.linesep.join(lines)
+
+    def trace(self, stage: str, func, *args):
+        """Calls func(*args) and keeps peak of memory allocated by it.
+        Returns result of func"""
+        if tracemalloc.is_tracing():
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            result = func(*args)
+            self.peaks[stage] = tracemalloc.get_traced_memory()[1] - before
+            return result
+        tracemalloc.start()
+        try:
+            result = func(*args)
+            self.peaks[stage] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return result
+
+    def mark(self):
+        """The first point of difference: allocations after it are
+        traced"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.is_tracing_started = True
+        self.snapshot = tracemalloc.take_snapshot()
+
+    def diff(self, path, limit=50) -> tuple:
+        """Writes the biggest differences between mark() and now by
+        source line. Returns (number of lines, total difference)"""
+        if self.snapshot is None:
+            raise MemStatsException("there is no mark to compare with")
+        snapshot = tracemalloc.take_snapshot()
+        stats = snapshot.compare_to(self.snapshot, "lineno")
+        try:
+            with open(path, "w") as fh:
+                for stat in stats[:limit]:
+                    fh.write(str(stat) + "\n")
+        except OSError as e:
+            raise MemStatsException(f"can not write '{path}': {e.strerror}")
+        if self.is_tracing_started:
+            tracemalloc.stop()
+            self.is_tracing_started = False
+        self.snapshot = None
+        return (min(len(stats), limit), sum(stat.size_diff for stat in stats))
+
+
+if __name__ == "__main__":
+    from addressbook import AddressBook
+
+    def letters(number: int) -> str:
+        word = ""
+        for __ in range(4):
+            (number, ix) = divmod(number, 32)
+            word += chr(ord("а") + ix)
+        return word.capitalize()
+
+    stats = MemStats()
+    records = tuple((f"Абонент {letters(ix)}",
+                     ("Phone", f"+38 (067) {ix // 100:03d}-{ix % 100:02d}-11"),
+                     ("Address", f"вул. Остробрамська {ix % 200}, кв. {ix}"))
+                    for ix in range(20000))
+    ab = stats.trace("load", AddressBook, records)
+    stats.trace("dump", ab.JSON_helper)
+    print(stats.report(ab))
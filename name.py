@@ -10,6 +10,8 @@ License: MIT
 import re
 
 from field import Field
+from linearpattern import LinearPattern, assertion, char, is_boundary, \
+    is_word, opt, seq, star
 
 
 class NameException(Exception):
@@ -18,6 +20,14 @@ class NameException(Exception):
         super(Exception, self).__init__(*args, **kwargs)
 
 
+# (?![0-9_]) and (?<![0-9_])
+_digits = tuple("0123456789_")
+_not_digit_next = assertion(
+    lambda text, pos: text[pos:pos + 1] not in _digits)
+_not_digit_prev = assertion(
+    lambda text, pos: text[pos - 1:pos] not in _digits)
+
+
 class Name(Field):
     # Common pattern for each object
     pattern_name = (r"\b\w(?![0-9_])"
@@ -28,6 +38,17 @@ class Name(Field):
                         + r"(?:\s" + pattern_name
                         + r"(?:\s" + pattern_name + r")?"
                         + r")?", re.IGNORECASE) # up to 3 word name pattern
+    # The same pattern in linear time: it is used to verify name
+    scanner_word = seq(
+        assertion(is_boundary), char(is_word), _not_digit_next,
+        star(seq(_not_digit_prev, char(lambda c: is_word(c) or c in "'-"),
+                 _not_digit_next)),
+        opt(seq(opt(char(":")), char(is_word), _not_digit_next)),
+        assertion(is_boundary))
+    scanner_name = LinearPattern(seq(
+        scanner_word, opt(seq(char(str.isspace), scanner_word,
+                              opt(seq(char(str.isspace), scanner_word))))),
+        pattern_name)
 
     def __init__(self, name):
         super().__init__(value=name, title="Name", order=10)
@@ -47,7 +68,7 @@ class Name(Field):
 
     def verify(self, name: str) -> bool:
         """Check name format"""
-        m = Name.pattern_name.search(name)
+        m = Name.scanner_name.search(name)
         if not bool(m):
             NameException(f"incorrect name '{name}'")
         if m.start() != 0:
@@ -107,6 +128,10 @@ class Name(Field):
             return True
         return False
 
+    def canonical(self) -> str:
+        """Case and word order independent form of name"""
+        return " ".join(sorted(str(self).lower().split(' ')))
+
     def __hash__(self):
         return str(self).__hash__()
 
@@ -10,6 +10,7 @@ License: MIT
 import re
 
 from field import Field
+from linearpattern import LinearPattern, alt, char, opt, rep, seq, star
 
 
 class PhoneException(Exception):
@@ -23,6 +24,18 @@ class Phone(Field):
     pattern_phone_number = re.compile(
             r"(?:\+\d{1,3})?\s*(?:\(\d{2,5}\)|\d{2,5})?"
             r"\s*\d{1,3}(?:\s*-)?\s*\d{1,3}(?:\s*-)?\s*\d{1,3}")
+    # The same pattern in linear time: it is used to verify number
+    scanner_digit = char(str.isdecimal)
+    scanner_spaces = star(char(str.isspace))
+    scanner_phone_number = LinearPattern(seq(
+        opt(seq(char("+"), rep(scanner_digit, 1, 3))), scanner_spaces,
+        opt(alt(seq(char("("), rep(scanner_digit, 2, 5), char(")")),
+                rep(scanner_digit, 2, 5))), scanner_spaces,
+        rep(scanner_digit, 1, 3), opt(seq(scanner_spaces, char("-"))),
+        scanner_spaces,
+        rep(scanner_digit, 1, 3), opt(seq(scanner_spaces, char("-"))),
+        scanner_spaces,
+        rep(scanner_digit, 1, 3)), pattern_phone_number)
 
     def __init__(self, phone=""):
         super().__init__(value=phone, title="Phone", order=30)
@@ -45,7 +58,7 @@ class Phone(Field):
 
     def verify(self, phone: str) -> bool:
         """Check phone format"""
-        m = Phone.pattern_phone_number.search(phone)
+        m = Phone.scanner_phone_number.search(phone)
         if not bool(m):
             return f"incorrect number '{phone}'"
         if m.start() != 0:
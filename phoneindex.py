@@ -0,0 +1,159 @@
+"""Class PhoneIndex
+
+Author: Dmytro Tarasiuk
+URL: https://github.com/RoyBebru/addressbook
+Email: RoyBebru@gmail.com
+License: MIT
+"""
+
+
+from bisect import bisect_left, bisect_right, insort
+
+from index import Index
+
+
+class PhoneIndex(Index):
+    """Phones as sorted digit strings, the same digits which
+    Phone.__eq__ compares: prefix search costs O(log N + k)"""
+    # Greater than any digit
+    key_max = ":"
+
+    def __init__(self):
+        # Sorted (digits, serial) pairs: serial keeps equal phones apart
+        self.items = []
+        # Serial -> record, record -> [(digits, serial)], record -> Name
+        self.records = {}
+        self.record_items = {}
+        self.names = {}
+        self.serial = 0
+
+    @staticmethod
+    def digits(phone) -> str:
+        return "".join(filter(str.isdigit, str(phone)))
+
+    def _phone_keys(self, record) -> list:
+        return [PhoneIndex.digits(field.value) for field in record.fields
+                if field.title == "Phone" and bool(field.value)]
+
+    def _link(self, record):
+        items = []
+        for key in self._phone_keys(record):
+            self.serial += 1
+            item = (key, self.serial)
+            insort(self.items, item)
+            self.records[self.serial] = record
+            items.append(item)
+        if bool(items):
+            self.record_items[record] = items
+
+    def _unlink(self, record):
+        for item in self.record_items.pop(record, ()):
+            del self.items[bisect_left(self.items, item)]
+            del self.records[item[1]]
+
+    def rebuild(self, ab):
+        self.clear()
+        for (name, record) in ab.data.items():
+            self.names[record] = name
+            items = []
+            for key in self._phone_keys(record):
+                self.serial += 1
+                items.append((key, self.serial))
+                self.records[self.serial] = record
+            if bool(items):
+                self.items.extend(items)
+                self.record_items[record] = items
+        self.items.sort()
+
+    def on_record_added(self, name, record):
+        self.names[record] = name
+        self._link(record)
+
+    def on_record_removed(self, name, record):
+        self._unlink(record)
+        self.names.pop(record, None)
+
+    def on_record_renamed(self, old_name, name, record):
+        self.names[record] = name
+
+    def on_record_changed(self, record):
+        items = self.record_items.get(record, ())
+        if [key for (key, __) in items] == self._phone_keys(record):
+            return # phones are not changed
+        self._unlink(record)
+        self._link(record)
+
+    def clear(self):
+        self.__init__()
+
+    def state(self):
+        return sorted((key, str(self.names[self.records[serial]]))
+                      for (key, serial) in self.items)
+
+    def _bounds(self, first, last) -> tuple:
+        start = bisect_left(self.items, (first,))
+        if last is None:
+            stop = len(self.items)
+        else:
+            stop = bisect_right(self.items, (last + PhoneIndex.key_max,))
+        return (start, max(start, stop))
+
+    def _names(self, start, stop) -> tuple:
+        """Record with a few matching phones is given once"""
+        names = {}
+        for (__, serial) in self.items[start:stop]:
+            name = self.names[self.records[serial]]
+            names[id(name)] = name
+        return tuple(names.values())
+
+    def count(self, first="", last=None) -> int:
+        """Upper estimate: phones, not records, are counted"""
+        (start, stop) = self._bounds(first, last)
+        return stop - start
+
+    def prefix(self, prefix: str) -> tuple:
+        """Names with phone starting with prefix digits in phone order"""
+        prefix = PhoneIndex.digits(prefix)
+        return self._names(*self._bounds(prefix, prefix))
+
+    def equal(self, phone: str) -> tuple:
+        key = PhoneIndex.digits(phone)
+        return self._names(bisect_left(self.items, (key,)),
+                           bisect_right(self.items, (key, self.serial + 1)))
+
+    def range(self, first="", last=None) -> tuple:
+        """Names with phone from first up to phones starting with last
+        inclusive: range("38067", "38068") gives 38067... and 38068..."""
+        if last is not None:
+            last = PhoneIndex.digits(last)
+        return self._names(*self._bounds(PhoneIndex.digits(first), last))
+
+    def dump(self):
+        return {"items": self.items,
+                "names": {serial: str(self.names[record])
+                          for (serial, record) in self.records.items()}}
+
+    def load(self, state, lookup):
+        self.clear()
+        for (name, record) in lookup.values():
+            self.names[record] = name
+        self.items = state["items"]
+        for (key, serial) in sorted(self.items, key=lambda it: it[1]):
+            record = lookup[state["names"][serial]][1]
+            self.records[serial] = record
+            self.record_items.setdefault(record, []).append((key, serial))
+        self.serial = max((serial for (__, serial) in self.items), default=0)
+
+
+if __name__ == "__main__":
+    from addressbook import AddressBook
+    ab = AddressBook((
+        ("Кузьо Мартін", ("Phone", "+38 (067) 111-22-33"),
+         ("Phone", "+38 067 444-55-66")),
+        ("Галафея Навчибожечко", ("Phone", "+38 (068) 111-55-66")),
+        ("Бебру Бебрович", ("Phone", "111-22-33")),
+    ), build_indexes=False)
+    phones = ab.register_index("phones", PhoneIndex())
+    for names in (phones.prefix("+38067*"), phones.equal("111-22-33"),
+                  phones.range("38067", "38068")):
+        print(tuple(str(name) for name in names))
@@ -0,0 +1,407 @@
+"""Class Query
+
+Author: Dmytro Tarasiuk
+URL: https://github.com/RoyBebru/addressbook
+Email: RoyBebru@gmail.com
+License: MIT
+
+Query language with field predicates and AND/OR/NOT combinators:
+    phone:067* AND NOT name:Бебру
+    (address:Остробрамська OR comment:алкаш) birthday:>01.01.1990
+Words without combinator are joined with AND, word without field
+title is a name. Query is compiled to a plan: AND evaluates its most
+selective indexed operand and filters the rest record by record.
+"""
+
+
+from abc import ABC, abstractmethod
+from datetime import datetime
+import os
+import re
+
+from birthday import Birthday, BirthdayException
+from textindex import TextIndex
+
+
+class QueryException(Exception):
+    def __init__(self, *args, **kwargs):
+        # Call parent constructor
+        super(Exception, self).__init__(*args, **kwargs)
+
+
+def _wildcard_to_regex(sample: str):
+    """'*' matches any characters, '?' matches one character"""
+    return re.compile("".join(
+        ".*" if char == '*' else "." if char == '?' else re.escape(char)
+        for char in sample), re.IGNORECASE)
+
+
+class Node(ABC):
+    """Plan node. Indexed node produces candidates without scanning"""
+
+    def is_indexed(self, ab) -> bool:
+        return False
+
+    def estimate(self, ab, universe) -> int:
+        return len(universe)
+
+    def candidates(self, ab, universe) -> set:
+        return set(name for name in universe if self.match(ab, name))
+
+    @abstractmethod
+    def match(self, ab, name) -> bool:
+        pass
+
+    @abstractmethod
+    def explain(self, ab, universe, indent=0) -> list:
+        pass
+
+    def _line(self, ab, universe, indent, text) -> str:
+        access = "INDEX" if self.is_indexed(ab) else "SCAN"
+        return (" " * indent
+                + f"{access} {text} (~{self.estimate(ab, universe)})")
+
+
+class NamePredicate(Node):
+
+    def __init__(self, value: str):
+        self.value = value
+        self.regex = None
+        if '*' in value or '?' in value:
+            self.regex = _wildcard_to_regex(value)
+
+    def match(self, ab, name) -> bool:
+        if self.regex is None:
+            return name.is_substr(self.value)
+        return bool(self.regex.fullmatch(str(name)))
+
+    def explain(self, ab, universe, indent=0) -> list:
+        return [self._line(ab, universe, indent, f"name:{self.value}")]
+
+
+class PhonePredicate(Node):
+
+    def __init__(self, value: str):
+        self.value = value
+        # Phones are compared by digits as Phone.__eq__ does
+        digits = "".join(filter(lambda c: c.isdigit() or c in "*?", value))
+        if len(digits) == 0:
+            raise QueryException(f"digits are required in phone '{value}'")
+        self.regex = _wildcard_to_regex(digits)
+        # Exact digits or prefix of digits is served by PhoneIndex
+        self.key = None
+        if re.fullmatch(r"\d+\*?", digits):
+            self.key = digits
+
+    def is_indexed(self, ab) -> bool:
+        return self.key is not None and "phones" in ab.indexes
+
+    def estimate(self, ab, universe) -> int:
+        if not self.is_indexed(ab):
+            return len(universe)
+        key = self.key.rstrip('*')
+        return ab.indexes["phones"].count(key, key)
+
+    def candidates(self, ab, universe) -> set:
+        if not self.is_indexed(ab):
+            return super().candidates(ab, universe)
+        if self.key.endswith('*'):
+            return set(ab.indexes["phones"].prefix(self.key))
+        return set(ab.indexes["phones"].equal(self.key))
+
+    def match(self, ab, name) -> bool:
+        for field in ab.data[name].fields:
+            if field.title == "Phone" and self.regex.fullmatch(
+                    "".join(filter(str.isdigit, field.value))):
+                return True
+        return False
+
+    def explain(self, ab, universe, indent=0) -> list:
+        return [self._line(ab, universe, indent, f"phone:{self.value}")]
+
+
+class BirthdayPredicate(Node):
+    operators = {
+        "=": lambda a, b: a == b,
+        ">": lambda a, b: a > b,
+        "<": lambda a, b: a < b,
+        ">=": lambda a, b: a >= b,
+        "<=": lambda a, b: a <= b,
+    }
+
+    def __init__(self, operator: str, value: str):
+        self.operator = operator or "="
+        try:
+            self.date = BirthdayPredicate.as_date(Birthday(value).value)
+        except BirthdayException as e:
+            raise QueryException(f"birthday {e.args[0]}")
+        self.compare = BirthdayPredicate.operators[self.operator]
+
+    @staticmethod
+    def as_date(birthday: str):
+        return datetime.strptime(birthday, r"%d.%m.%Y").date()
+
+    def _range(self) -> tuple:
+        """BirthdayIndex range arguments"""
+        key = self.date.strftime(r"%Y.%m.%d")
+        return {"=": (key, key, True, True),
+                ">": (key, None, False, True),
+                ">=": (key, None, True, True),
+                "<": (None, key, True, False),
+                "<=": (None, key, True, True),
+                }[self.operator]
+
+    def is_indexed(self, ab) -> bool:
+        return "birthdays" in ab.indexes
+
+    def estimate(self, ab, universe) -> int:
+        if not self.is_indexed(ab):
+            return len(universe)
+        return ab.indexes["birthdays"].count(*self._range())
+
+    def candidates(self, ab, universe) -> set:
+        if not self.is_indexed(ab):
+            return super().candidates(ab, universe)
+        return set(ab.indexes["birthdays"].range(*self._range()))
+
+    def match(self, ab, name) -> bool:
+        for field in ab.data[name].fields:
+            if field.title == "Birthday" and bool(field.value):
+                return self.compare(
+                    BirthdayPredicate.as_date(field.value), self.date)
+        return False
+
+    def explain(self, ab, universe, indent=0) -> list:
+        return [self._line(ab, universe, indent, "birthday:" + self.operator
+                           + self.date.strftime(r"%d.%m.%Y"))]
+
+
+class TextPredicate(Node):
+    """Words in Address or Comment: served by TextIndex"""
+
+    def __init__(self, title: str, value: str):
+        self.title = title
+        self.value = value
+        words = TextIndex.tokenize(value)
+        if len(words) == 0:
+            raise QueryException(f"word is required in '{value}'")
+        self.terms = tuple((word, title, False) for word in words[:-1]) \
+            + ((words[-1], title, value.endswith('*')),)
+
+    def is_indexed(self, ab) -> bool:
+        return True
+
+    def estimate(self, ab, universe) -> int:
+        return min(len(ab.text_index.lookup(*term)) for term in self.terms)
+
+    def candidates(self, ab, universe) -> set:
+        return set(ab.text_index.find(self.terms))
+
+    def match(self, ab, name) -> bool:
+        record = ab.data[name]
+        return all(ab.text_index.contains(record, *term)
+                   for term in self.terms)
+
+    def explain(self, ab, universe, indent=0) -> list:
+        return [self._line(ab, universe, indent,
+                           f"{self.title.lower()}:{self.value}")]
+
+
+class And(Node):
+
+    def __init__(self, operands):
+        self.operands = operands
+
+    def _plan(self, ab, universe) -> list:
+        """Operands by selectivity: the first indexed one is driver"""
+        return sorted(self.operands,
+                      key=lambda node: (not node.is_indexed(ab),
+                                        node.estimate(ab, universe)))
+
+    def is_indexed(self, ab) -> bool:
+        return any(node.is_indexed(ab) for node in self.operands)
+
+    def estimate(self, ab, universe) -> int:
+        return min(node.estimate(ab, universe) for node in self.operands)
+
+    def candidates(self, ab, universe) -> set:
+        (driver, *filters) = self._plan(ab, universe)
+        return set(name for name in driver.candidates(ab, universe)
+                   if all(node.match(ab, name) for node in filters))
+
+    def match(self, ab, name) -> bool:
+        return all(node.match(ab, name) for node in self.operands)
+
+    def explain(self, ab, universe, indent=0) -> list:
+        (driver, *filters) = self._plan(ab, universe)
+        lines = [self._line(ab, universe, indent, "AND")]
+        lines += driver.explain(ab, universe, indent + 2)
+        for node in filters:
+            lines.append(" " * (indent + 2) + "FILTER")
+            lines += node.explain(ab, universe, indent + 4)
+        return lines
+
+
+class Or(Node):
+
+    def __init__(self, operands):
+        self.operands = operands
+
+    def is_indexed(self, ab) -> bool:
+        return all(node.is_indexed(ab) for node in self.operands)
+
+    def estimate(self, ab, universe) -> int:
+        return min(len(universe), sum(node.estimate(ab, universe)
+                                      for node in self.operands))
+
+    def candidates(self, ab, universe) -> set:
+        if not self.is_indexed(ab):
+            return super().candidates(ab, universe)
+        names = set()
+        for node in self.operands:
+            names |= node.candidates(ab, universe)
+        return names
+
+    def match(self, ab, name) -> bool:
+        return any(node.match(ab, name) for node in self.operands)
+
+    def explain(self, ab, universe, indent=0) -> list:
+        lines = [self._line(ab, universe, indent, "OR")]
+        for node in self.operands:
+            lines += node.explain(ab, universe, indent + 2)
+        return lines
+
+
+class Not(Node):
+
+    def __init__(self, operand):
+        self.operand = operand
+
+    def match(self, ab, name) -> bool:
+        return not self.operand.match(ab, name)
+
+    def explain(self, ab, universe, indent=0) -> list:
+        return ([self._line(ab, universe, indent, "NOT")]
+                + self.operand.explain(ab, universe, indent + 2))
+
+
+class Query:
+    pattern_token = re.compile(
+        r'\s*(?:(?P<paren>[()])'
+        r'|(?P<field>\w+):(?P<operator>>=|<=|>|<|=)?'
+        r'(?P<value>"[^"]*"|[^\s()]+)'
+        r'|(?P<word>"[^"]*"|[^\s()]+))')
+    keywords = {"AND": "AND", "І": "AND", "OR": "OR", "АБО": "OR",
+                "NOT": "NOT", "НЕ": "NOT"}
+
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens = self._tokenize(text)
+        if len(self.tokens) == 0:
+            raise QueryException("query is empty")
+        self.pos = 0
+        self.plan = self._parse_or()
+        if self.pos != len(self.tokens):
+            raise QueryException(f"unexpected '{self.tokens[self.pos][1]}'")
+
+    def _tokenize(self, text: str) -> list:
+        tokens = []
+        pos = 0
+        text = text.rstrip()
+        while pos < len(text):
+            m = Query.pattern_token.match(text, pos)
+            if not bool(m):
+                raise QueryException(f"syntax error in '{text[pos:]}'")
+            pos = m.end()
+            if m["paren"] is not None:
+                tokens.append((m["paren"], m["paren"]))
+            elif m["field"] is not None:
+                tokens.append(("field", (m["field"], m["operator"],
+                                         m["value"].strip('"'))))
+            elif m["word"].upper() in Query.keywords:
+                keyword = Query.keywords[m["word"].upper()]
+                tokens.append((keyword, keyword))
+            else:
+                tokens.append(("field", ("name", None, m["word"].strip('"'))))
+        return tokens
+
+    def _peek(self):
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos][0]
+        return None
+
+    def _parse_or(self):
+        operands = [self._parse_and()]
+        while self._peek() == "OR":
+            self.pos += 1
+            operands.append(self._parse_and())
+        return operands[0] if len(operands) == 1 else Or(operands)
+
+    def _parse_and(self):
+        operands = [self._parse_not()]
+        while self._peek() in ("AND", "NOT", "field", "("):
+            if self._peek() == "AND":
+                self.pos += 1
+            operands.append(self._parse_not())
+        return operands[0] if len(operands) == 1 else And(operands)
+
+    def _parse_not(self):
+        if self._peek() == "NOT":
+            self.pos += 1
+            return Not(self._parse_not())
+        return self._parse_atom()
+
+    def _parse_atom(self):
+        kind = self._peek()
+        if kind is None:
+            raise QueryException("unexpected end of query")
+        (kind, value) = self.tokens[self.pos]
+        self.pos += 1
+        if kind == "(":
+            node = self._parse_or()
+            if self._peek() != ")":
+                raise QueryException("')' is expected")
+            self.pos += 1
+            return node
+        if kind != "field":
+            raise QueryException(f"unexpected '{value}'")
+        return Query.predicate(*value)
+
+    @staticmethod
+    def predicate(field: str, operator, value: str) -> Node:
+        title = field.capitalize()
+        if operator is not None and title != "Birthday":
+            raise QueryException(f"comparison is not supported for '{field}'")
+        if title == "Name":
+            return NamePredicate(value)
+        if title == "Phone":
+            return PhonePredicate(value)
+        if title == "Birthday":
+            return BirthdayPredicate(operator, value)
+        if title in TextIndex.titles:
+            return TextPredicate(title, value)
+        raise QueryException(f"unknown field '{field}'")
+
+    def run(self, ab) -> tuple:
+        """Returns names of matching records. Records and indexes are
+        read under reader lock of ThreadSafeAddressBook"""
+        with ab.lock.reader:
+            universe = ab.keys()
+            return tuple(sorted(self.plan.candidates(ab, universe), key=str))
+
+    def explain(self, ab) -> str:
+        with ab.lock.reader:
+            return os.linesep.join(self.plan.explain(ab, ab.keys()))
+
+
+if __name__ == "__main__":
+    from addressbook import AddressBook
+    ab = AddressBook((
+        ("Кузьо Мартін Йогович", ("Phone", "067 111-22-33"),
+         ("Birthday", "10.11.1990"), ("Address", "Остробрамська 10")),
+        ("Галафея Навчибожечко", ("Phone", "111-55-66"),
+         ("Address", "Героїв Космосу 21")),
+    ))
+    query = Query("phone:067* birthday:>01.01.1990 OR address:геро*")
+    print(query.explain(ab))
+    print(tuple(str(name) for name in query.run(ab)))
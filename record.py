@@ -7,12 +7,16 @@ License: MIT
 """
 
 
+import copy
 import os
 
 from address import Address
+from changeevent import FieldAdded, FieldChanged, FieldRemoved, \
+    RecordChanged
 from birthday import Birthday
 from comment import Comment
 from phone import Phone
+from rwlock import NoLock
 
 
 class RecordException(Exception):
@@ -21,8 +25,18 @@ class RecordException(Exception):
         super(Exception, self).__init__(*args, **kwargs)
 
 
+def _locked(method):
+    """Change of record is made under lock of its address book"""
+    def locked(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return locked
+
+
 class Record:
     """Can contain any Field exclude Name"""
+    # Writer side of address book lock: it is set by thread safe book
+    lock = NoLock.writer
     known_field_titles = {"Phone": Phone
                          , "Birthday": Birthday
                          , "Address": Address
@@ -31,13 +45,40 @@ class Record:
 
     def __init__(self, fields):
         self.fields = ()
+        # Callables observer(event) get ChangeEvent after each change
+        self.observers = []
         self.add(fields)
 
+    def _notify(self, event):
+        for observer in self.observers:
+            observer(event)
+
+    def _set_fields(self, fields):
+        """Replaces fields with their subset"""
+        removed = tuple(field for field in self.fields
+                        if all(field is not kept for kept in fields))
+        self.fields = tuple(fields)
+        for field in removed:
+            self._notify(FieldRemoved(self, field))
+
+    def copy(self):
+        """Record with copies of fields and without observers"""
+        record = Record(())
+        record.fields = tuple(copy.copy(field) for field in self.fields)
+        return record
+
+    @_locked
+    def replace_fields(self, fields):
+        """Replaces all fields at once: observers get one event"""
+        self.fields = tuple(fields)
+        self._notify(RecordChanged(self))
+
     def sort_fields(self):
         fields = list(self.fields)
         fields.sort(key=lambda e: e.order)
         return fields
 
+    @_locked
     def add(self, fields):
         for record_pair in fields:
             try:
@@ -57,7 +98,52 @@ class Record:
                     continue # do not create duplicate of unique field
             # Add new field to tuple
             self.fields += (new_field,)
-
+            self._notify(FieldAdded(self, new_field))
+
+    @staticmethod
+    def _is_in(field, fields) -> bool:
+        return any(field.title == title and field == value
+                   for (title, value) in fields)
+
+    @_locked
+    def merge(self, fields, base=()) -> tuple:
+        """Three-way merge with fields of other side: base is fields of
+        both sides before changes. Fields which other side removed from
+        base are removed, fields which are absent in record and in base
+        are added. Returns fields which conflict with present unique
+        fields and so are not added"""
+        base = tuple((title, value) for (title, value) in base)
+        removed = tuple(field for field in self.fields
+                        if Record._is_in(field, base)
+                        and not Record._is_in(field, fields))
+        if bool(removed):
+            self._set_fields(tuple(field for field in self.fields
+                                   if all(field is not it for it in removed)))
+        conflicts = ()
+        for record_pair in fields:
+            if (record_pair[0], record_pair[1]) in base:
+                continue # field is kept or removed by this side
+            for field in self.fields:
+                if field.title == record_pair[0]:
+                    if field == record_pair[1]:
+                        break # such field is already present
+                    if field.is_unique:
+                        conflicts += ((record_pair[0], record_pair[1]),)
+                        break
+            else:
+                self.add(((record_pair[0], record_pair[1]),))
+        return conflicts
+
+    def field(self, title: str, field_no=1):
+        """field_no-th field with title in sorted order or None"""
+        for field in self.sort_fields():
+            if field.title == title:
+                field_no -= 1
+                if field_no <= 0:
+                    return field
+        return None
+
+    @_locked
     def change(self, title: str, value: str, field_no=1):
         if isinstance(title, str):
             if not bool(title):
@@ -65,23 +151,21 @@ class Record:
             if not bool(value):
                 # Title is present but value is absent
                 raise RecordException("to change a new parameter is required")
-            fields = list(self.fields)
-            fields.sort(key=lambda e: e.order)
-            for field in self.sort_fields():
-                if field.title == title:
-                    field_no -= 1
-                    if field_no <= 0:
-                        field.value = value # changing field
-                        break
+            field = self.field(title, field_no)
+            if field is not None:
+                old_value = field.value
+                field.value = value # changing field
+                self._notify(FieldChanged(self, field, old_value))
             return
 
+    @_locked
     def delete(self, title="", value="", field_no=1):
         if isinstance(title, str):
             if not bool(title):
                 # Field title is absent: remove all field with value,
                 # field_no is ignored 
-                self.fields = tuple(field for field in self.fields
-                                    if field != value)
+                self._set_fields(tuple(field for field in self.fields
+                                       if field != value))
                 return
             if not bool(value):
                 # Title is present but value is absent: removing
@@ -94,12 +178,12 @@ class Record:
                             del field
                             continue # forget field
                     fields += (field,)
-                self.fields = fields
+                self._set_fields(fields)
                 return
             # Title and value is present: delete field with value.
             # field_no is ignored.
-            self.fields = tuple(field for field in self.fields
-                                if field.title != title or field != value)
+            self._set_fields(tuple(field for field in self.fields
+                                   if field.title != title or field != value))
             return
 
     def __str__(self):
@@ -0,0 +1,96 @@
+"""Class RWLock
+
+Author: Dmytro Tarasiuk
+URL: https://github.com/RoyBebru/addressbook
+Email: RoyBebru@gmail.com
+License: MIT
+"""
+
+
+from contextlib import nullcontext
+import threading
+
+
+class _Guard:
+    """Reusable context manager of one side of RWLock"""
+
+    def __init__(self, acquire, release):
+        self.acquire = acquire
+        self.release = release
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+        return False
+
+
+class RWLock:
+    """Many readers or one writer:
+        with lock.reader: ...
+        with lock.writer: ...
+    Writer waits for readers which are inside and new readers wait for
+    writer, so writers are not starved. Thread can take the side it
+    holds again, and writer can take reader. Reader can not become
+    writer: it is deadlock when two readers try it.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        # Thread id -> depth of reader
+        self._readers = {}
+        self._writer = None
+        self._writer_depth = 0
+        self._writers_waiting = 0
+        self.reader = _Guard(self.acquire_read, self.release_read)
+        self.writer = _Guard(self.acquire_write, self.release_write)
+
+    def acquire_read(self):
+        me = threading.get_ident()
+        with self._condition:
+            if self._writer != me and me not in self._readers:
+                while self._writer is not None or self._writers_waiting > 0:
+                    self._condition.wait()
+            self._readers[me] = self._readers.get(me, 0) + 1
+
+    def release_read(self):
+        me = threading.get_ident()
+        with self._condition:
+            if self._readers[me] > 1:
+                self._readers[me] -= 1
+                return
+            del self._readers[me]
+            if len(self._readers) == 0:
+                self._condition.notify_all()
+
+    def acquire_write(self):
+        me = threading.get_ident()
+        with self._condition:
+            if self._writer == me:
+                self._writer_depth += 1
+                return
+            if me in self._readers:
+                raise RuntimeError("reader can not become writer")
+            self._writers_waiting += 1
+            try:
+                while self._writer is not None or len(self._readers) > 0:
+                    self._condition.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = me
+            self._writer_depth = 1
+
+    def release_write(self):
+        with self._condition:
+            self._writer_depth -= 1
+            if self._writer_depth == 0:
+                self._writer = None
+                self._condition.notify_all()
+
+
+class NoLock:
+    """The same interface as RWLock without locking"""
+    reader = nullcontext()
+    writer = nullcontext()
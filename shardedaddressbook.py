@@ -0,0 +1,167 @@
+"""Class ShardedAddressBook
+
+Author: Dmytro Tarasiuk
+URL: https://github.com/RoyBebru/addressbook
+Email: RoyBebru@gmail.com
+License: MIT
+"""
+
+
+from collections import UserDict
+import hashlib
+import json
+
+from addressbook import AddressBook
+from bookfile import BookFile
+from name import Name
+from record import Record
+from shardstore import ShardStore
+
+
+class ShardedAddressBook(AddressBook):
+    """AddressBook over ShardStore: shards are loaded on demand and
+    only shards with changed content are written back by save()
+    """
+
+    def __init__(self, store: ShardStore, workers=None):
+        self.store = store
+        self.workers = workers
+        # Loaded shard number -> digest of its content on disk
+        self._loaded = {}
+        # AddressBook constructor would clear (and so load) all shards
+        UserDict.__init__(self)
+        self.indexes = {}
+        self.create_indexes()
+        self.is_modified = False
+
+    def _digest(self, content: dict) -> str:
+        return hashlib.sha1(json.dumps(content, ensure_ascii=False)
+                            .encode("utf-8")).hexdigest()
+
+    def _add_shard(self, shard_no, content: dict):
+        for (name, record_list_of_list) in content.items():
+            self._attach(Name(name), Record(tuple(
+                (pair[0], pair[1]) for pair in record_list_of_list)))
+        self._loaded[shard_no] = self._digest(
+            self.JSON_helper(Name(name) for name in content.keys()))
+
+    @property
+    def loaded_shards(self) -> int:
+        return len(self._loaded)
+
+    def _load_shard(self, key):
+        shard_no = self.store.shard_of(key)
+        if shard_no not in self._loaded:
+            self._add_shard(shard_no, self.store.read(shard_no))
+
+    def _load_all(self):
+        absent = tuple(shard_no for shard_no in range(self.store.shards)
+                       if shard_no not in self._loaded)
+        if len(absent) == 0:
+            return
+        for (shard_no, content) in self.store.read_many(absent, self.workers):
+            self._add_shard(shard_no, content)
+
+    def __getitem__(self, key):
+        if isinstance(key, Name):
+            self._load_shard(key)
+        else:
+            self._load_all()
+        return super().__getitem__(key)
+
+    def __setitem__(self, key, value):
+        if isinstance(key, Name) or isinstance(key, str):
+            self._load_shard(key)
+            if isinstance(key, Name) and isinstance(value, str):
+                self._load_shard(value) # renamed record moves to other shard
+        else:
+            self._load_all()
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._load_shard(key)
+        super().__delitem__(key)
+        self.is_modified = True
+
+    def __contains__(self, key):
+        self._load_shard(key)
+        return super().__contains__(key)
+
+    def __len__(self):
+        return len(self.data) + sum(self.store.counts[shard_no]
+                                    for shard_no in range(self.store.shards)
+                                    if shard_no not in self._loaded)
+
+    def __iter__(self):
+        self._load_all()
+        return super().__iter__()
+
+    def keys(self):
+        self._load_all()
+        return super().keys()
+
+    def report(self, names=None, index=1):
+        if names is None:
+            self._load_all()
+        return super().report(names, index)
+
+    def iter_by_sample(self, sample: str, names=None):
+        if names is None:
+            self._load_all()
+        return super().iter_by_sample(sample, names)
+
+    def JSON_helper(self, names=None):
+        if names is None:
+            self._load_all()
+        return super().JSON_helper(names)
+
+    def find(self, query: str) -> tuple:
+        self._load_all()
+        return super().find(query)
+
+    def sorted_keys(self, first="", last="") -> tuple:
+        self._load_all()
+        return super().sorted_keys(first, last)
+
+    def prefix_keys(self, prefix: str) -> tuple:
+        self._load_all()
+        return super().prefix_keys(prefix)
+
+    def phone_keys(self, phone: str) -> tuple:
+        self._load_all()
+        return super().phone_keys(phone)
+
+    def complete_word(self, prefix: str, limit=None) -> list:
+        self._load_all()
+        return super().complete_word(prefix, limit)
+
+    def save(self):
+        """Writes loaded shards whose content differs from disk"""
+        shard_names = {shard_no: [] for shard_no in self._loaded.keys()}
+        for name in self.data.keys():
+            shard_names[self.store.shard_of(name)].append(name)
+        for (shard_no, names) in shard_names.items():
+            content = self.JSON_helper(names)
+            digest = self._digest(content)
+            if digest != self._loaded[shard_no]:
+                self.store.write(shard_no, content)
+                self._loaded[shard_no] = digest
+        self.store.write_meta()
+        self.is_modified = False
+
+
+if __name__ == "__main__":
+    # Converts address book file into sharded layout:
+    # $ python3 shardedaddressbook.py main.abo main.abs 16
+    import sys
+    if len(sys.argv) < 3:
+        print(f"Usage: {sys.argv[0]} <book.abo> <book.abs> [shards]")
+        sys.exit(1)
+    content = BookFile(sys.argv[1]).read()
+    shards = int(sys.argv[3]) if len(sys.argv) > 3 else 16
+    ab = ShardedAddressBook(ShardStore(sys.argv[2], shards=shards))
+    ab._load_all() # new empty store: no shard is read
+    for (name, record_list_of_list) in content.items():
+        ab[name] = tuple((pair[0], pair[1]) for pair in record_list_of_list)
+    ab.save()
+    print(f"{len(ab)} record(s) in {shards} shard(s)")
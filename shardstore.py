@@ -0,0 +1,93 @@
+"""Class ShardStore
+
+Author: Dmytro Tarasiuk
+URL: https://github.com/RoyBebru/addressbook
+Email: RoyBebru@gmail.com
+License: MIT
+"""
+
+
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from name import Name
+
+
+class ShardStoreException(Exception):
+    def __init__(self, *args, **kwargs):
+        # Call parent constructor
+        super(Exception, self).__init__(*args, **kwargs)
+
+
+class ShardStore:
+    """Directory of N shard files partitioned by hash of canonical name:
+        main.abs/meta.json  {"shards": N, "counts": [...]}
+        main.abs/000.abo    the same JSON format as main.abo
+        ...
+    """
+    META_FILE = "meta.json"
+
+    def __init__(self, path, shards=None):
+        self.path = Path(path)
+        try:
+            with open(self.path / ShardStore.META_FILE, "r") as fh:
+                meta = json.loads(fh.read())
+            self.shards = meta["shards"]
+            self.counts = meta.get("counts", [0] * self.shards)
+        except FileNotFoundError:
+            if shards is None:
+                raise ShardStoreException(f"no shard store in '{self.path}'")
+            if shards < 1:
+                raise ShardStoreException(f"wrong shard number {shards}")
+            self.path.mkdir(parents=True, exist_ok=True)
+            self.shards = shards
+            self.counts = [0] * shards
+            self.write_meta()
+
+    def shard_of(self, name) -> int:
+        """Shard number is stable between runs: hash() is salted"""
+        if not isinstance(name, Name):
+            name = Name(name)
+        digest = hashlib.sha1(name.canonical().encode("utf-8")).digest()
+        return int.from_bytes(digest[:4], "big") % self.shards
+
+    def shard_path(self, shard_no) -> Path:
+        return self.path / ("%03d.abo" % shard_no)
+
+    def read(self, shard_no) -> dict:
+        try:
+            with open(self.shard_path(shard_no), "r") as fh:
+                return json.loads(fh.read())
+        except FileNotFoundError:
+            return {}
+
+    def read_many(self, shard_nos, workers=None):
+        """Yields (shard_no, dict) reading shards in parallel"""
+        shard_nos = tuple(shard_nos)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            yield from zip(shard_nos, pool.map(self.read, shard_nos))
+
+    def write(self, shard_no, content: dict):
+        # Write to temporary file and rename: shard is never half written
+        path = self.shard_path(shard_no)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w") as fh:
+            fh.write(json.dumps(content, indent=2, ensure_ascii=False))
+        os.replace(tmp_path, path)
+        self.counts[shard_no] = len(content)
+
+    def write_meta(self):
+        with open(self.path / ShardStore.META_FILE, "w") as fh:
+            fh.write(json.dumps({"shards": self.shards,
+                                 "counts": self.counts}))
+
+
+if __name__ == "__main__":
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ShardStore(Path(tmp) / "main.abs", shards=8)
+        print(store.shards, store.shard_of("Кузьо Мартін Йогович"),
+              store.shard_of(" йогович  КУЗЬО мартін"))
@@ -0,0 +1,251 @@
+"""Class SharedBook
+
+Author: Dmytro Tarasiuk
+URL: https://github.com/RoyBebru/addressbook
+Email: RoyBebru@gmail.com
+License: MIT
+"""
+
+
+from contextlib import contextmanager
+import json
+import os
+from pathlib import Path
+
+from bookfile import BookFile
+from name import Name
+
+try:
+    import fcntl
+except ModuleNotFoundError:
+    fcntl = None # advisory locking is not supported (Windows)
+
+
+class SharedBook:
+    """Address book file which is shared between processes.
+
+    Remembers JSON text of each record as it was on disk after the
+    last load, refresh or save. Comparing local and disk records with
+    it tells which side has changed the record. When both sides have
+    changed the same record, fields are merged against it: fields added
+    by either side are kept and fields removed by either side are
+    removed. Two values of unique field or a record deleted on one side
+    and changed on the other are reported as a conflict: no change is
+    lost. File can be compressed by codec of its suffix (see BookFile).
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        # Plain or compressed by suffix
+        self.book = BookFile(path)
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+        # File (mtime, size) and content digest of the last known disk state
+        self.stat = None
+        self.digest = None
+        # Name -> record JSON text of the last known disk state
+        self.base = {}
+
+    @contextmanager
+    def _locked(self, exclusive=False):
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, "a") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _read(self):
+        """Returns (stat, digest, content) of book file"""
+        stat = self._stat()
+        try:
+            content = self.book.read()
+        except FileNotFoundError:
+            return (None, None, {})
+        return (stat, self.book.digest, content)
+
+    @staticmethod
+    def record_text(record_list_of_list) -> str:
+        """Compared instead of record: it is merge base too"""
+        return json.dumps(record_list_of_list, ensure_ascii=False)
+
+    @staticmethod
+    def _as_pairs(record_list_of_list) -> tuple:
+        return tuple((pair[0], pair[1]) for pair in record_list_of_list)
+
+    def load(self) -> tuple:
+        """Returns records in AddressBook constructor format"""
+        try:
+            with self._locked():
+                (self.stat, self.digest, content) = self._read()
+        except PermissionError:
+            return ()
+        self.base = {name: SharedBook.record_text(record_list_of_list)
+                     for (name, record_list_of_list) in content.items()}
+        return tuple((name,) + SharedBook._as_pairs(record_list_of_list)
+                     for (name, record_list_of_list) in content.items())
+
+    def is_changed_on_disk(self) -> bool:
+        stat = self._stat()
+        if stat == self.stat:
+            return False
+        with self._locked():
+            (stat, digest, __) = self._read()
+        if digest == self.digest:
+            # Touched but not changed
+            self.stat = stat
+            return False
+        return True
+
+    def is_changed_locally(self, ab) -> bool:
+        """Records of ab differ from the last known disk state"""
+        content = ab.JSON_helper()
+        return content.keys() != self.base.keys() or any(
+            SharedBook.record_text(record_list_of_list) != self.base[name]
+            for (name, record_list_of_list) in content.items())
+
+    def _merge(self, ab, stat, digest, content) -> tuple:
+        """Applies records changed on disk to ab.
+        Returns (changed_names, conflict_names)"""
+        disk = {name: SharedBook.record_text(record_list_of_list)
+                for (name, record_list_of_list) in content.items()}
+        changed = ()
+        conflicts = ()
+        is_modified = ab.is_modified
+        for name in set(disk.keys()) | set(self.base.keys()):
+            base_text = self.base.get(name)
+            disk_text = disk.get(name)
+            if disk_text == base_text:
+                continue # record is not changed on disk
+            key = Name(name)
+            if key in ab.data:
+                local_text = SharedBook.record_text(
+                    ab.JSON_helper((key,))[name])
+            else:
+                local_text = None
+            if local_text == disk_text:
+                continue # the same change is made on both sides
+            changed += (name,)
+            if local_text == base_text:
+                # Record is not changed locally: take record from disk
+                if disk_text is None:
+                    ab.pop(key)
+                else:
+                    ab[name] = SharedBook._as_pairs(content[name])
+                continue
+            # Both sides changed record
+            is_modified = True
+            if disk_text is None or local_text is None:
+                # One side deleted record: keep record of other side
+                conflicts += (name,)
+                if local_text is None:
+                    ab[name] = SharedBook._as_pairs(content[name])
+                continue
+            record = ab.data[key]
+            base = () if base_text is None else json.loads(base_text)
+            unmerged = record.merge(SharedBook._as_pairs(content[name]),
+                                    SharedBook._as_pairs(base))
+            if bool(unmerged):
+                conflicts += (name,)
+            for (title, value) in unmerged:
+                # Unique field can not have two values: keep both as text
+                record.add((("Comment", f"{title} conflict: {value}"),))
+        ab.is_modified = is_modified
+        self.stat = stat
+        self.digest = digest
+        self.base = disk
+        return (changed, conflicts)
+
+    def refresh(self, ab) -> tuple:
+        """Reloads records changed by other processes.
+        Returns (changed_names, conflict_names)"""
+        if not self.is_changed_on_disk():
+            return ((), ())
+        with self._locked():
+            (stat, digest, content) = self._read()
+        return self._merge(ab, stat, digest, content)
+
+    def save(self, ab) -> tuple:
+        """Merges changes of other processes and writes book.
+        Returns (changed_names, conflict_names)"""
+        with self._locked(exclusive=True):
+            (stat, digest, content) = self._read()
+            if digest != self.digest:
+                result = self._merge(ab, stat, digest, content)
+            else:
+                result = ((), ())
+            content = ab.JSON_helper()
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            self.book.write(content, tmp_path)
+            os.replace(tmp_path, self.path)
+            self.stat = self._stat()
+            self.digest = self.book.digest
+        self.base = {name: SharedBook.record_text(record_list_of_list)
+                     for (name, record_list_of_list) in content.items()}
+        ab.is_modified = False
+        return result
+
+
+def _stress_name(writer_no, iteration):
+    # Name can not contain digits
+    letters = str.maketrans("0123456789", "abcdefghij")
+    return (f"Writer{writer_no} Record{iteration}").translate(letters)
+
+
+def _stress_writer(path, writer_no, iterations):
+    from addressbook import AddressBook
+    shared = SharedBook(path)
+    ab = AddressBook(shared.load())
+    for iteration in range(iterations):
+        shared.refresh(ab)
+        ab[_stress_name(writer_no, iteration)] = (
+            ("Phone", f"{writer_no:03d}-{iteration:03d}-00"),)
+        # Every writer changes the same record: conflicts are merged
+        ab[Name("Shared Record")].add(
+            (("Phone", f"{writer_no:03d}-{iteration:03d}-11"),))
+        ab.is_modified = True
+        shared.save(ab)
+
+
+if __name__ == "__main__":
+    # Multi-process stress test: many concurrent writers of one file
+    from multiprocessing import Process
+    import tempfile
+    import time
+    from addressbook import AddressBook
+
+    WRITERS = 8
+    ITERATIONS = 25
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "stress.abo"
+        shared = SharedBook(path)
+        shared.save(AddressBook((("Shared Record",),)))
+        start = time.perf_counter()
+        processes = [Process(target=_stress_writer,
+                             args=(path, writer_no, ITERATIONS))
+                     for writer_no in range(WRITERS)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+        ab = AddressBook(SharedBook(path).load())
+        lost = [(writer_no, iteration)
+                for writer_no in range(WRITERS)
+                for iteration in range(ITERATIONS)
+                if Name(_stress_name(writer_no, iteration)) not in ab]
+        phones = len(ab[Name("Shared Record")].fields)
+        print(f"{WRITERS} writers x {ITERATIONS} saves: {elapsed:.2f}s, "
+              f"records {len(ab)}, lost {len(lost)}, "
+              f"shared record phones {phones}/{WRITERS * ITERATIONS}")
+        assert len(lost) == 0
+        assert phones == WRITERS * ITERATIONS
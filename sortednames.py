@@ -0,0 +1,122 @@
+"""Class SortedNames
+
+Author: Dmytro Tarasiuk
+URL: https://github.com/RoyBebru/addressbook
+Email: RoyBebru@gmail.com
+License: MIT
+"""
+
+
+from bisect import bisect_left, bisect_right
+
+from index import Index
+
+
+class SortedNames(Index):
+    """Names sorted in ukrainian alphabet order. Parallel lists of
+    collation keys and names are kept sorted by bisect, so range and
+    prefix listing costs O(log N + k)
+    """
+    alphabet = "абвгґдеєжзиіїйклмнопрстуфхцчшщьюя"
+    # Ukrainian letters follow latin ones; apostrophe is ignored
+    collation = {ord(letter): chr(0x1000 + ix)
+                 for (ix, letter) in enumerate(alphabet)}
+    collation.update({ord("'"): None, ord("’"): None, ord("ʼ"): None})
+    # Greater than any collation key character
+    key_max = chr(0x10FFFF)
+
+    def __init__(self):
+        self.keys = []
+        self.names = []
+
+    @staticmethod
+    def key(name) -> str:
+        return str(name).casefold().translate(SortedNames.collation)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def add(self, name):
+        key = SortedNames.key(name)
+        ix = bisect_right(self.keys, key)
+        self.keys.insert(ix, key)
+        self.names.insert(ix, name)
+
+    def _index(self, name, old_name) -> int:
+        """Renamed name object is found by identity or by old_name"""
+        key = SortedNames.key(old_name)
+        ix = bisect_left(self.keys, key)
+        while ix < len(self.keys) and self.keys[ix] == key:
+            if self.names[ix] is name or self.names[ix] == old_name:
+                return ix
+            ix += 1
+        raise KeyError(str(old_name))
+
+    def remove(self, name, old_name=None):
+        ix = self._index(name, name if old_name is None else old_name)
+        del self.keys[ix]
+        del self.names[ix]
+
+    def clear(self):
+        self.keys.clear()
+        self.names.clear()
+
+    def rebuild(self, ab):
+        pairs = sorted(((SortedNames.key(name), name)
+                        for name in ab.data.keys()), key=lambda it: it[0])
+        self.keys = [key for (key, __) in pairs]
+        self.names = [name for (__, name) in pairs]
+
+    def on_record_added(self, name, record):
+        self.add(name)
+
+    def on_record_removed(self, name, record):
+        self.remove(name)
+
+    def on_record_renamed(self, old_name, name, record):
+        self.remove(name, old_name)
+        self.add(name)
+
+    def on_record_changed(self, record):
+        pass # fields are not indexed
+
+    def state(self):
+        return (self.keys, [str(name) for name in self.names])
+
+    def dump(self):
+        return {"keys": self.keys, "names": [str(name) for name in self.names]}
+
+    def load(self, state, lookup):
+        if len(state["names"]) != len(lookup):
+            raise ValueError("records are not the same")
+        self.keys = state["keys"]
+        self.names = [lookup[name][0] for name in state["names"]]
+
+    def range(self, first="", last="") -> tuple:
+        """Names from first up to names starting with last inclusive:
+        range("А", "Г") gives names starting with А, Б, В and Г"""
+        start = bisect_left(self.keys, SortedNames.key(first))
+        if bool(last):
+            stop = bisect_right(self.keys,
+                                SortedNames.key(last) + SortedNames.key_max)
+        else:
+            stop = len(self.keys)
+        return tuple(self.names[start:stop])
+
+    def prefix(self, prefix: str) -> tuple:
+        key = SortedNames.key(prefix)
+        return tuple(self.names[bisect_left(self.keys, key):
+                                bisect_right(self.keys,
+                                             key + SortedNames.key_max)])
+
+
+if __name__ == "__main__":
+    names = SortedNames()
+    for name in ("Ґудзь", "Гай", "Єрмак", "Ivanov", "Іванів", "Кас'ян",
+                 "Касько", "Їжак", "Шевченко", "Бабенко"):
+        names.add(name)
+    print(names.names)
+    print(names.range("А", "Г"), names.prefix("Кас"))
@@ -0,0 +1,198 @@
+"""Class TextIndex
+
+Author: Dmytro Tarasiuk
+URL: https://github.com/RoyBebru/addressbook
+Email: RoyBebru@gmail.com
+License: MIT
+"""
+
+
+from bisect import bisect_left, insort
+import re
+
+from index import Index
+
+
+class TextIndex(Index):
+    """Inverted index of words in Address and Comment fields:
+        (title, word) -> set of ids of records containing such word
+    Words are case folded. Sorted word list of each title gives
+    words with prefix without scanning records. Records are referred
+    by integer id: snapshot of index is restored without rebuilding.
+    """
+    titles = ("Address", "Comment")
+    # Words as Address.normalize splits them without punctuation
+    pattern_word = re.compile(r"\w+(?:['’-]\w+)*")
+
+    def __init__(self):
+        self.postings = {}
+        self.words = {title: [] for title in TextIndex.titles}
+        # Record id -> set of its (title, word)
+        self.record_keys = {}
+        # Record -> id, id -> record, record -> Name
+        self.ids = {}
+        self.records = {}
+        self.names = {}
+        self.serial = 0
+
+    @staticmethod
+    def tokenize(text: str) -> list:
+        return [word.casefold()
+                for word in TextIndex.pattern_word.findall(" ".join(
+                    str(text).split()))]
+
+    def _keys(self, record) -> set:
+        return set((field.title, word)
+                   for field in record.fields
+                   if field.title in self.words
+                   for word in TextIndex.tokenize(field.value))
+
+    def _new_id(self, name, record) -> int:
+        self.serial += 1
+        self.ids[record] = self.serial
+        self.records[self.serial] = record
+        self.names[record] = name
+        return self.serial
+
+    def _link(self, record_id):
+        keys = self._keys(self.records[record_id])
+        self.record_keys[record_id] = keys
+        for key in keys:
+            posting = self.postings.get(key)
+            if posting is None:
+                self.postings[key] = posting = set()
+                insort(self.words[key[0]], key[1])
+            posting.add(record_id)
+
+    def _unlink(self, record_id):
+        for key in self.record_keys.pop(record_id, ()):
+            posting = self.postings[key]
+            posting.discard(record_id)
+            if len(posting) == 0:
+                del self.postings[key]
+                words = self.words[key[0]]
+                del words[bisect_left(words, key[1])]
+
+    def rebuild(self, ab):
+        self.clear()
+        for (name, record) in ab.data.items():
+            record_id = self._new_id(name, record)
+            keys = self._keys(record)
+            self.record_keys[record_id] = keys
+            for key in keys:
+                self.postings.setdefault(key, set()).add(record_id)
+        for (title, word) in self.postings.keys():
+            self.words[title].append(word)
+        for words in self.words.values():
+            words.sort()
+
+    def add(self, name, record):
+        self._link(self._new_id(name, record))
+
+    def remove(self, record):
+        record_id = self.ids.pop(record)
+        self._unlink(record_id)
+        del self.records[record_id]
+        del self.names[record]
+
+    def update(self, record):
+        """Reindexes changed record"""
+        record_id = self.ids[record]
+        self._unlink(record_id)
+        self._link(record_id)
+
+    def rename(self, record, name):
+        self.names[record] = name
+
+    def clear(self):
+        self.__init__()
+
+    def on_record_added(self, name, record):
+        self.add(name, record)
+
+    def on_record_removed(self, name, record):
+        self.remove(record)
+
+    def on_record_renamed(self, old_name, name, record):
+        self.rename(record, name)
+
+    def on_record_changed(self, record):
+        self.update(record)
+
+    def state(self):
+        """Ids differ in rebuilt index: records are compared by name"""
+        names = {record_id: str(self.names[record])
+                 for (record_id, record) in self.records.items()}
+        return ({key: frozenset(names[record_id] for record_id in posting)
+                 for (key, posting) in self.postings.items()},
+                self.words, frozenset(names.values()))
+
+    def dump(self):
+        return {"names": {record_id: str(self.names[record])
+                          for (record_id, record) in self.records.items()},
+                "serial": self.serial,
+                "postings": self.postings,
+                "record_keys": self.record_keys}
+
+    def load(self, state, lookup):
+        self.clear()
+        for (record_id, name) in state["names"].items():
+            (name, record) = lookup[name]
+            self.ids[record] = record_id
+            self.records[record_id] = record
+            self.names[record] = name
+        if len(self.records) != len(lookup):
+            raise ValueError("records are not the same")
+        self.serial = state["serial"]
+        self.postings = state["postings"]
+        self.record_keys = state["record_keys"]
+        for (title, word) in self.postings.keys():
+            self.words[title].append(word)
+        for words in self.words.values():
+            words.sort()
+
+    def lookup(self, word: str, title=None, prefix=False) -> set:
+        """Returns set of record ids with such word (or word prefix)"""
+        titles = TextIndex.titles if title is None else (title,)
+        word = word.casefold()
+        records = set()
+        for title in titles:
+            if not prefix:
+                records |= self.postings.get((title, word), set())
+                continue
+            words = self.words.get(title, ())
+            ix = bisect_left(words, word)
+            while ix < len(words) and words[ix].startswith(word):
+                records |= self.postings[(title, words[ix])]
+                ix += 1
+        return records
+
+    def contains(self, record, word: str, title=None, prefix=False) -> bool:
+        """Checks record for word without scanning other records"""
+        word = word.casefold()
+        for (key_title, key_word) in self.record_keys.get(
+                self.ids.get(record), ()):
+            if title is not None and key_title != title:
+                continue
+            if key_word == word or (prefix and key_word.startswith(word)):
+                return True
+        return False
+
+    def find(self, terms) -> tuple:
+        """terms: ((word, title_or_None, is_prefix), ...)
+        Returns names of records containing all terms"""
+        postings = sorted((self.lookup(word, title, prefix)
+                           for (word, title, prefix) in terms), key=len)
+        if len(postings) == 0:
+            return ()
+        records = set(postings[0])
+        for posting in postings[1:]:
+            if len(records) == 0:
+                break
+            records &= posting
+        return tuple(sorted((self.names[self.records[record_id]]
+                             for record_id in records), key=str))
+
+
+if __name__ == "__main__":
+    print(TextIndex.tokenize("вул. Місячного  Сяйва, 11Б, кв.73 Кас'ян"))
@@ -0,0 +1,199 @@
+"""Class ThreadSafeAddressBook
+
+Author: Dmytro Tarasiuk
+URL: https://github.com/RoyBebru/addressbook
+Email: RoyBebru@gmail.com
+License: MIT
+"""
+
+
+from addressbook import AddressBook
+from name import Name
+from rwlock import RWLock
+
+
+class ThreadSafeAddressBook(AddressBook):
+    """AddressBook which can be shared between threads. Readers run in
+    parallel, and change of book or of its record is exclusive: records
+    get writer side of the book lock. Iteration goes over snapshot of
+    names, so the book can be changed while it is iterated.
+    """
+
+    def __init__(self, records=(), build_indexes=True):
+        self.lock = RWLock()
+        super().__init__(records, build_indexes)
+
+    # Writers
+
+    def __setitem__(self, key, value):
+        with self.lock.writer:
+            super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        with self.lock.writer:
+            record = self.data[key]
+            super().__delitem__(key)
+            del record.lock # record does not belong to book
+
+    def pop(self, key, *default):
+        with self.lock.writer:
+            return super().pop(key, *default)
+
+    def _attach(self, name, record):
+        with self.lock.writer:
+            present = self.data.get(name)
+            super()._attach(name, record)
+            if present is not None and present is not record:
+                del present.lock
+            record.lock = self.lock.writer
+
+    def register_index(self, name: str, index, rebuild=True):
+        with self.lock.writer:
+            return super().register_index(name, index, rebuild)
+
+    def unregister_index(self, name: str):
+        with self.lock.writer:
+            return super().unregister_index(name)
+
+    # Readers
+
+    def __getitem__(self, key):
+        with self.lock.reader:
+            return super().__getitem__(key)
+
+    def __contains__(self, key):
+        with self.lock.reader:
+            return key in self.data
+
+    def __len__(self):
+        with self.lock.reader:
+            return len(self.data)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def keys(self):
+        with self.lock.reader:
+            return tuple(self.data.keys())
+
+    def items(self):
+        with self.lock.reader:
+            return tuple(self.data.items())
+
+    def values(self):
+        with self.lock.reader:
+            return tuple(self.data.values())
+
+    def get(self, key, default=None):
+        with self.lock.reader:
+            return self.data.get(key, default)
+
+    def check_indexes(self) -> tuple:
+        with self.lock.reader:
+            return super().check_indexes()
+
+    def sorted_keys(self, first="", last="") -> tuple:
+        with self.lock.reader:
+            return super().sorted_keys(first, last)
+
+    def prefix_keys(self, prefix: str) -> tuple:
+        with self.lock.reader:
+            return super().prefix_keys(prefix)
+
+    def phone_keys(self, phone: str) -> tuple:
+        with self.lock.reader:
+            return super().phone_keys(phone)
+
+    def complete_word(self, prefix: str, limit=None) -> list:
+        with self.lock.reader:
+            return super().complete_word(prefix, limit)
+
+    def report(self, names=None, index=1):
+        with self.lock.reader:
+            return super().report(names, index)
+
+    def iter_by_sample(self, sample: str, names=None):
+        # Lock is not held between yields: matches are found at once
+        with self.lock.reader:
+            if isinstance(names, tuple) or isinstance(names, list):
+                # Names could be deleted after they were got
+                names = tuple(name for name in names if name in self.data)
+            names = tuple(super().iter_by_sample(sample, names))
+        return iter(names)
+
+    def find(self, query: str) -> tuple:
+        with self.lock.reader:
+            return super().find(query)
+
+    def JSON_helper(self, names=None):
+        with self.lock.reader:
+            return super().JSON_helper(names)
+
+
+if __name__ == "__main__":
+    # Stress test: writers change records while readers search them.
+    # Read throughput is measured for growing number of readers.
+    import random
+    import threading
+    import time
+
+    def name_of(number: int) -> str:
+        return "Абонент " + "".join(chr(ord("а") + int(digit))
+                                    for digit in f"{number:04d}")
+
+    def writer(ab, stop, errors, seed):
+        rnd = random.Random(seed)
+        try:
+            while not stop.is_set():
+                name = Name(name_of(rnd.randrange(400)))
+                action = rnd.randrange(4)
+                record = ab.get(name)
+                if record is None:
+                    ab[str(name)] = (("Phone", "111-22-33"),)
+                elif action == 0:
+                    phone = f"222-33-{rnd.randrange(100):02d}"
+                    record.add((("Phone", phone),))
+                elif action == 1:
+                    record.delete("Phone")
+                elif action == 2:
+                    with ab.transaction() as tx:
+                        if name in ab:
+                            tx.change(name, "Phone", "333-44-55")
+                else:
+                    ab.pop(name, None)
+        except Exception as e:
+            errors.append(e)
+
+    def reader(ab, stop, errors, counter):
+        try:
+            while not stop.is_set():
+                tuple(ab.iter_by_sample("*22*"))
+                for name in ab:
+                    ab.get(name)
+                counter.append(1)
+        except Exception as e:
+            errors.append(e)
+
+    ab = ThreadSafeAddressBook(tuple((name_of(ix), ("Phone", "111-22-33"))
+                                     for ix in range(200)))
+    for readers in (1, 2, 4, 8):
+        stop = threading.Event()
+        errors = []
+        counters = [[] for __ in range(readers)]
+        threads = [threading.Thread(target=writer,
+                                    args=(ab, stop, errors, ix))
+                   for ix in range(2)]
+        threads += [threading.Thread(target=reader,
+                                     args=(ab, stop, errors, counter))
+                    for counter in counters]
+        for thread in threads:
+            thread.start()
+        time.sleep(2)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        assert errors == [], errors
+        reads = sum(len(counter) for counter in counters)
+        print(f"{readers} reader(s), 2 writers: {reads / 2:.0f} scans/s")
+    assert ab.check_indexes() == ()
+    print(f"No errors, indexes are consistent ({len(ab)} records)")
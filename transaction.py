@@ -0,0 +1,204 @@
+"""Class Transaction
+
+Author: Dmytro Tarasiuk
+URL: https://github.com/RoyBebru/addressbook
+Email: RoyBebru@gmail.com
+License: MIT
+"""
+
+
+import copy
+
+from name import Name
+
+
+class TransactionException(Exception):
+    def __init__(self, *args, **kwargs):
+        # Call parent constructor
+        super(Exception, self).__init__(*args, **kwargs)
+
+
+class Transaction:
+    """Bulk change of AddressBook which is done entirely or not at all:
+        with ab.transaction() as tx:
+            for name in names:
+                tx.change(name, "Phone", "111-22-33")
+    Changes are staged on copies of records, so a wrong value raises
+    exception before the book is touched. Exception inside 'with'
+    discards the transaction. Commit applies changes in one pass: each
+    record gets one change event, and when a lot of records is changed
+    indexes are detached and rebuilt once.
+    """
+    # Indexes are rebuilt when more than 1/rebuild_share of book changes
+    rebuild_share = 8
+
+    def __init__(self, ab):
+        self.ab = ab
+        # Name -> staged copy of record
+        self.staged = {}
+        self.removed = set()
+        # Name -> new name
+        self.renamed = {}
+        # (title, value) -> field: the same value is validated once
+        self.fields = {}
+
+    def __enter__(self):
+        # Nobody changes book between staging and commit
+        self.ab.lock.writer.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if exc_type is None:
+                self.commit()
+        finally:
+            self.ab.lock.writer.__exit__(exc_type, exc_value, traceback)
+        return False
+
+    def _key(self, name):
+        """Returns (name, record) of present record"""
+        if not isinstance(name, Name):
+            name = Name(name)
+        if name in self.removed:
+            raise TransactionException(f"record '{name}' is deleted")
+        return (name, self.ab[name]) # KeyError for absent record
+
+    def _staged(self, name):
+        staged = self.staged.get(name)
+        if staged is None:
+            (name, record) = self._key(name)
+            staged = self.staged[name] = record.copy()
+        return staged
+
+    def add(self, name, fields):
+        """Adds fields as Record.add() does"""
+        self._staged(name).add(fields)
+
+    def change(self, name, title: str, value: str, field_no=1):
+        """Changes field as Record.change() does"""
+        staged = self._staged(name)
+        field = staged.field(title, field_no)
+        if field is None or not bool(value):
+            staged.change(title, value, field_no) # it raises or does nothing
+            return
+        new_field = self.fields.get((title, value))
+        if new_field is None:
+            new_field = copy.copy(field)
+            new_field.value = value # validation
+            self.fields[(title, value)] = new_field
+        staged.fields = tuple(copy.copy(new_field) if item is field else item
+                              for item in staged.fields)
+
+    def delete(self, name, title="", value="", field_no=1):
+        """Deletes field(s) as Record.delete() does"""
+        self._staged(name).delete(title, value, field_no)
+
+    def remove(self, name):
+        """Deletes record"""
+        name = self._key(name)[0]
+        self.staged.pop(name, None)
+        self.renamed.pop(name, None)
+        self.removed.add(name)
+
+    def rename(self, name, new_name: str):
+        """New name can be taken by record which is deleted in the
+        transaction only"""
+        name = self._key(name)[0]
+        new_name = Name(new_name)
+        if new_name != name and (
+                any(new_name == other for other in self.renamed.values())
+                or (new_name in self.ab
+                    and all(new_name != other for other in self.removed))):
+            raise TransactionException(f"name '{new_name}' already exists")
+        self.renamed[name] = str(new_name)
+
+    def __len__(self):
+        return len(self.staged.keys() | self.removed | self.renamed.keys())
+
+    def commit(self):
+        """Applies staged changes: they are already validated"""
+        if len(self) == 0:
+            return
+        ab = self.ab
+        indexes = ab.indexes
+        bulk = len(self) > max(64, len(ab.data) // Transaction.rebuild_share)
+        if bulk:
+            # Records notify address book which has no index now
+            ab.indexes = {}
+        try:
+            for (name, staged) in self.staged.items():
+                ab[name].replace_fields(staged.fields)
+            for name in self.removed:
+                del ab[name]
+            for (name, new_name) in tuple(self.renamed.items()):
+                ab[name] = new_name
+        finally:
+            if bulk:
+                ab.indexes = indexes
+                for index in indexes.values():
+                    index.rebuild(ab)
+        ab.is_modified = True
+        self.__init__(ab)
+
+
+if __name__ == "__main__":
+    # All or nothing and speed of mass change
+    import time
+    from addressbook import AddressBook
+    from phone import PhoneException
+
+    def letters(number: int) -> str:
+        word = ""
+        for __ in range(4):
+            (number, ix) = divmod(number, 32)
+            word += chr(ord("а") + ix)
+        return word.capitalize()
+
+    count = 100000
+    start = time.perf_counter()
+    ab = AddressBook(tuple((f"Абонент {letters(ix)}",
+                            ("Phone", f"111-{ix // 100:03d}-{ix % 100:02d}"))
+                           for ix in range(count)))
+    print(f"{count} records are loaded in "
+          f"{time.perf_counter() - start:.2f} s")
+    names = tuple(ab.keys())
+    before = ab[None]
+
+    try:
+        with ab.transaction() as tx:
+            for (ix, name) in enumerate(names):
+                tx.change(name, "Phone", "222-33-44" if ix < count - 1
+                          else "wrong")
+    except PhoneException as e:
+        print(f"Transaction is discarded: {e.args[0]}")
+    assert ab[None] == before
+
+    start = time.perf_counter()
+    for name in names:
+        ab[name].change("Phone", "333-44-55")
+    print(f"record by record: {count} changes in "
+          f"{time.perf_counter() - start:.2f} s")
+
+    start = time.perf_counter()
+    with ab.transaction() as tx:
+        for name in names:
+            tx.change(name, "Phone", "222-33-44")
+    print(f"transaction: {count} changes in "
+          f"{time.perf_counter() - start:.2f} s")
+
+    start = time.perf_counter()
+    with ab.transaction() as tx:
+        for name in names[::2]:
+            tx.remove(name)
+    print(f"transaction: {count // 2} deletes in "
+          f"{time.perf_counter() - start:.2f} s")
+    assert len(ab) == count // 2
+    assert ab.check_indexes() == ()
+
+    # Change of record held after the book is cleared
+    held = ab[names[1]]
+    ab[None] = ()
+    held.add((("Phone", "444-55-66"),))
+    assert len(ab) == 0
+    assert ab.check_indexes() == ()
+    print("Indexes are consistent")
@@ -0,0 +1,129 @@
+"""Class Trie
+
+Author: Dmytro Tarasiuk
+URL: https://github.com/RoyBebru/addressbook
+Email: RoyBebru@gmail.com
+License: MIT
+"""
+
+
+from sortednames import SortedNames
+
+
+class Trie:
+    """Prefix tree of words. The same word can be added many times:
+    it is removed when it is removed the same number of times. Node is
+    dict: character -> child node and Trie.end -> {word: count} of words
+    ending in the node. Path of word is its casefold form, so completion
+    ignores case and gives words as they were added.
+    """
+    # Key of words in node: it is not a character
+    end = ""
+
+    def __init__(self):
+        self.root = {}
+        # Number of distinct words
+        self.size = 0
+
+    @staticmethod
+    def key(word: str) -> str:
+        return word.casefold()
+
+    def _node(self, prefix: str):
+        node = self.root
+        for char in Trie.key(prefix):
+            node = node.get(char)
+            if node is None:
+                return None
+        return node
+
+    def add(self, word: str, count=1):
+        node = self.root
+        for char in Trie.key(word):
+            child = node.get(char)
+            if child is None:
+                child = node[char] = {}
+            node = child
+        words = node.get(Trie.end)
+        if words is None:
+            words = node[Trie.end] = {}
+        if word not in words:
+            self.size += 1
+            words[word] = 0
+        words[word] += count
+
+    def remove(self, word: str):
+        """Word is found by its casefold form if there is no such
+        word exactly"""
+        path = []
+        node = self.root
+        for char in Trie.key(word):
+            path.append((node, char))
+            node = node.get(char)
+            if node is None:
+                raise KeyError(word)
+        words = node.get(Trie.end)
+        if words is None:
+            raise KeyError(word)
+        if word not in words:
+            word = next(iter(words.keys()))
+        words[word] -= 1
+        if words[word] > 0:
+            return
+        del words[word]
+        self.size -= 1
+        if len(words) == 0:
+            del node[Trie.end]
+        # Empty nodes are pruned
+        for (parent, char) in reversed(path):
+            if len(parent[char]) > 0:
+                break
+            del parent[char]
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, word: str):
+        node = self._node(word)
+        return node is not None and Trie.end in node
+
+    def complete(self, prefix: str, limit=None) -> list:
+        """Words starting with prefix in ukrainian alphabet order.
+        Only limit words are visited"""
+        node = self._node(prefix)
+        if node is None:
+            return []
+        words = []
+        stack = [node]
+        while len(stack) > 0:
+            node = stack.pop()
+            if Trie.end in node:
+                words.extend(sorted(node[Trie.end].keys()))
+                if limit is not None and len(words) >= limit:
+                    return words[:limit]
+            stack.extend(node[char] for char in sorted(
+                (char for char in node.keys() if char != Trie.end),
+                key=SortedNames.key, reverse=True))
+        return words
+
+    def items(self):
+        """(word, count) of each distinct word"""
+        stack = [self.root]
+        while len(stack) > 0:
+            node = stack.pop()
+            for (char, child) in node.items():
+                if char == Trie.end:
+                    yield from child.items()
+                else:
+                    stack.append(child)
+
+
+if __name__ == "__main__":
+    trie = Trie()
+    for word in ("Кас'ян", "Касько", "касько", "Їжак", "Іван", "Ігор",
+                 "Іван", "Гай", "Ґудзь"):
+        trie.add(word)
+    print(trie.complete("ка"), trie.complete("і"), trie.complete(""))
+    trie.remove("Іван")
+    trie.remove("КАСЬКО")
+    print(len(trie), sorted(trie.items()))